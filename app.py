@@ -1,12 +1,27 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
+import csv
 import json
 import os
 from pathlib import Path
-import plotly.express as px
 from io import BytesIO
-import openpyxl
+from archive import (REPORT_COLUMNS, SCAN_COLUMNS, archive_available, compact_scans, export_csv,
+                     month_index, read_archive, scans_lock)
+from reports import compute_employee_metrics
+from retention import apply_retention, load_policy, read_summaries, summary_months
+from timesheet import FrameIndex, ScanIndex, build_timesheet
+
+# plotly.express et openpyxl ne sont importés qu'à l'ouverture des rapports
+
+SCAN_DTYPES = {'ID_Employé': str, 'Code_Barres': str}
+TAIL_BLOCK_SIZE = 64 * 1024
+
+def parse_scans(data):
+    """Lecture de lignes CSV de pointages (sans en-tête) avec la colonne DateTime"""
+    scans = pd.read_csv(BytesIO(data), header=None, names=SCAN_COLUMNS, dtype=SCAN_DTYPES)
+    scans['DateTime'] = pd.to_datetime(scans['Date'] + ' ' + scans['Heure'])
+    return scans
 
 class PointageSystem:
     def __init__(self):
@@ -15,15 +30,17 @@ class PointageSystem:
         self.data_dir.mkdir(exist_ok=True)
         self.employees_file = self.data_dir / "employees.json"
         self.scans_file = self.data_dir / "scans.csv"
+        self.archive_dir = self.data_dir / "archive"
         self.load_data()
 
     def load_data(self):
-        # Chargement des employés
-        """Chargement des données depuis les fichiers"""
+        """Chargement des données nécessaires au pointage.
+
+        Seuls les employés et les pointages du jour sont lus ici ; l'historique
+        complet est chargé au premier accès à ``scans_df``.
+        """
         # Chargement des employés depuis le JSON
         if self.employees_file.exists():
-            with open(self.employees_file, 'r') as f:
-                self.employees = json.load(f)
             try:
                 with open(self.employees_file, 'r', encoding='utf-8') as f:
                     self.employees = json.load(f)
@@ -34,58 +51,229 @@ class PointageSystem:
             self.employees = {}
             self.save_employees()
 
-        # Chargement des pointages
-        # Chargement des pointages depuis le CSV
+        # Chargement des pointages du jour depuis la fin du CSV
+        self._scans_df = None
+        self._scan_index = None
+        self._csv_months = None
         if self.scans_file.exists():
-            self.scans_df = pd.read_csv(self.scans_file)
-            # Conversion des colonnes de date et heure
-            self.scans_df['DateTime'] = pd.to_datetime(
-                self.scans_df['Date'] + ' ' + self.scans_df['Heure']
-            )
             try:
-                self.scans_df = pd.read_csv(self.scans_file)
-                # Conversion explicite des colonnes de date et heure
-                if not self.scans_df.empty:
-                    self.scans_df['DateTime'] = pd.to_datetime(
-                        self.scans_df['Date'] + ' ' + self.scans_df['Heure']
-                    )
+                self.today_scans, self._scans_offset = self._read_today_scans()
+                self._scans_ino = self.scans_file.stat().st_ino
             except Exception as e:
                 st.error(f"Erreur lors du chargement des pointages: {str(e)}")
-                self.scans_df = pd.DataFrame(columns=[
-                    'ID_Employé', 'Nom', 'Prénom', 'Code_Barres', 
-                    'Date', 'Heure', 'Type_Scan', 'DateTime'
-                ])
+                self.today_scans = self._empty_scans()
+                self._scans_offset = self.scans_file.stat().st_size
+                self._scans_ino = self.scans_file.stat().st_ino
         else:
-            self.scans_df = pd.DataFrame(columns=[
-                'ID_Employé', 'Nom', 'Prénom', 'Code_Barres', 
-                'Date', 'Heure', 'Type_Scan', 'DateTime'
-            ])
+            self._scans_df = self._empty_scans()
+            self.today_scans = self._empty_scans()
             self.save_scans()
 
+    @staticmethod
+    def _empty_scans():
+        return pd.DataFrame(columns=SCAN_COLUMNS + ['DateTime'])
+
+    def _read_today_scans(self):
+        """Lecture des pointages du jour en remontant le CSV depuis la fin.
+
+        Les pointages sont ajoutés dans l'ordre chronologique : la lecture
+        s'arrête au premier bloc contenant une ligne antérieure à aujourd'hui.
+        Retourne les pointages du jour et la position de fin de lecture.
+        """
+        today = datetime.now().strftime('%Y-%m-%d')
+        with open(self.scans_file, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            pos = size
+            data = b''
+            while pos > 0:
+                read_size = min(TAIL_BLOCK_SIZE, pos)
+                pos -= read_size
+                f.seek(pos)
+                data = f.read(read_size) + data
+                # La première ligne du bloc peut être incomplète
+                lines = data.split(b'\n', 1)
+                if pos > 0 and len(lines) == 2:
+                    first_line = lines[1].split(b'\n', 1)[0]
+                    row = next(csv.reader([first_line.decode('utf-8')]), [])
+                    if len(row) >= len(SCAN_COLUMNS) and row[4] < today:
+                        data = lines[1]
+                        break
+
+        # En-tête si le fichier a été lu en entier, ligne en cours d'écriture à la fin
+        if pos == 0:
+            data = data.split(b'\n', 1)[1] if b'\n' in data else b''
+        end = data.rfind(b'\n') + 1
+        offset = size - (len(data) - end)
+        if end == 0:
+            return self._empty_scans(), offset
+        scans = parse_scans(data[:end])
+        return scans[scans['Date'] == today].reset_index(drop=True), offset
+
+    @property
+    def scans_df(self):
+        """Pointages de scans.csv (hors archive), chargés au premier accès"""
+        if self._scans_df is None:
+            try:
+                with open(self.scans_file, 'rb') as f:
+                    data = f.read(self._scans_offset)
+                data = data.split(b'\n', 1)[1] if b'\n' in data else b''
+                self._scans_df = parse_scans(data) if data else self._empty_scans()
+            except Exception as e:
+                st.error(f"Erreur lors du chargement des pointages: {str(e)}")
+                self._scans_df = self._empty_scans()
+        return self._scans_df
+
+    @scans_df.setter
+    def scans_df(self, value):
+        self._scans_df = value
+        self._scan_index = None
+
+    @property
+    def scan_index(self):
+        """Index par employé des pointages, chaque mois étant lu à sa première consultation"""
+        if self._scan_index is None:
+            self._scan_index = ScanIndex(self._load_month)
+        return self._scan_index
+
+    def _load_month(self, month):
+        """Index d'un mois : index enregistré du mois archivé, puis lignes encore dans scans.csv"""
+        blocks = []
+        if self.archive_dir.exists() and archive_available():
+            archived = month_index(self.archive_dir, month)
+            if archived is not None:
+                blocks.append(archived)
+
+        # Regroupement par mois refait seulement quand scans_df a changé
+        scans = self.scans_df
+        if self._csv_months is None or self._csv_months[0] is not scans:
+            self._csv_months = (scans, dict(tuple(scans.groupby(scans['Date'].astype(str).str[:7]))))
+        current = self._csv_months[1].get(month)
+        if current is not None:
+            blocks.append(FrameIndex(current[REPORT_COLUMNS]))
+        return blocks
+
+    def get_scans(self, start=None, end=None, columns=None):
+        """Pointages entre deux dates incluses, archive comprise.
+
+        Seuls les mois archivés de la période et les colonnes demandées sont lus.
+        """
+        start = start.strftime('%Y-%m-%d') if start is not None else None
+        end = end.strftime('%Y-%m-%d') if end is not None else None
+        frames = []
+        if self.archive_dir.exists() and archive_available():
+            frames.append(read_archive(self.archive_dir, start, end, columns))
+
+        scans = self.scans_df
+        mask = pd.Series(True, index=scans.index)
+        if start is not None:
+            mask &= scans['Date'] >= start
+        if end is not None:
+            mask &= scans['Date'] <= end
+        scans = scans[mask]
+        frames.append(scans if columns is None else scans[columns])
+
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return self._empty_scans() if columns is None else pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def archive_scans(self):
+        """Archivage des mois clos, puis rechargement de la période en cours"""
+        try:
+            count = compact_scans(self.data_dir)
+            self.load_data()
+            return True, f"{count} pointages archivés"
+        except Exception as e:
+            return False, f"Erreur lors de l'archivage: {str(e)}"
+
+    def apply_retention(self):
+        """Application de la politique de rétention, puis rechargement des données"""
+        try:
+            result = apply_retention(self.data_dir)
+            self.load_data()
+            return True, (
+                f"{result['expired_scans']} pointages archivés, "
+                f"{len(result['purged_files'])} fichiers purgés"
+            )
+        except Exception as e:
+            return False, f"Erreur lors de l'application de la rétention: {str(e)}"
+
     def save_employees(self):
-        with open(self.employees_file, 'w') as f:
-            json.dump(self.employees, f, indent=4)
         """Sauvegarde des employés dans le fichier JSON"""
         try:
-            with open(self.employees_file, 'w', encoding='utf-8') as f:
+            # Fichier temporaire puis remplacement : le service d'ingestion ne lit jamais un fichier partiel
+            tmp_file = self.employees_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
                 json.dump(self.employees, f, indent=4, ensure_ascii=False)
+            os.replace(tmp_file, self.employees_file)
         except Exception as e:
             st.error(f"Erreur lors de la sauvegarde des employés: {str(e)}")
 
     def save_scans(self):
-        save_df = self.scans_df.copy()
-        if 'DateTime' in save_df.columns:
-            save_df = save_df.drop('DateTime', axis=1)
-        save_df.to_csv(self.scans_file, index=False)
         """Sauvegarde des pointages dans le fichier CSV"""
         try:
             save_df = self.scans_df.copy()
             if 'DateTime' in save_df.columns:
                 save_df = save_df.drop('DateTime', axis=1)
-            save_df.to_csv(self.scans_file, index=False, encoding='utf-8')
+            with scans_lock(self.scans_file):
+                save_df.to_csv(self.scans_file, index=False, encoding='utf-8', lineterminator='\n')
+            self._scans_offset = self.scans_file.stat().st_size
+            self._scans_ino = self.scans_file.stat().st_ino
+        except Exception as e:
+            st.error(f"Erreur lors de la sauvegarde des pointages: {str(e)}")
+
+    def _write_scans(self, new_scans):
+        """Écriture de pointages à la fin du CSV, verrou scans_lock déjà pris"""
+        with open(self.scans_file, 'ab') as f:
+            f.write(new_scans[SCAN_COLUMNS].to_csv(
+                index=False, header=False, lineterminator='\n'
+            ).encode('utf-8'))
+
+    def append_scans(self, new_scans):
+        """Ajout de pointages à la fin du CSV sans réécrire l'historique"""
+        try:
+            with scans_lock(self.scans_file):
+                self.refresh_scans()
+                self._write_scans(new_scans)
+                self.refresh_scans()
         except Exception as e:
             st.error(f"Erreur lors de la sauvegarde des pointages: {str(e)}")
 
+    def refresh_scans(self):
+        """Prise en compte des pointages ajoutés au CSV par le service d'ingestion"""
+        stat = self.scans_file.stat()
+        size = stat.st_size
+        offset = getattr(self, '_scans_offset', 0)
+        if size < offset or offset == 0 or stat.st_ino != self._scans_ino:
+            # Fichier réécrit (archivage) ou jamais lu : rechargement complet
+            self.load_data()
+            return
+
+        today = datetime.now().strftime('%Y-%m-%d')
+        if not self.today_scans.empty and self.today_scans['Date'].iloc[0] != today:
+            # Changement de jour
+            self.today_scans = self._empty_scans()
+        if size == offset:
+            return
+
+        with open(self.scans_file, 'rb') as f:
+            f.seek(offset)
+            chunk = f.read(size - offset)
+        # Une ligne en cours d'écriture est lue au prochain rafraîchissement
+        end = chunk.rfind(b'\n') + 1
+        if end == 0:
+            return
+        new_scans = parse_scans(chunk[:end])
+        self.today_scans = pd.concat(
+            [self.today_scans, new_scans[new_scans['Date'] == today]], ignore_index=True
+        )
+        if self._scans_df is not None:
+            self._scans_df = pd.concat([self._scans_df, new_scans], ignore_index=True)
+        if self._scan_index is not None:
+            self._scan_index.append(new_scans[REPORT_COLUMNS])
+        self._scans_offset = offset + end
+
     def add_employee(self, id_emp, nom, prenom, code_barre):
         """Ajout d'un nouvel employé"""
         if code_barre not in self.employees:
@@ -110,37 +298,38 @@ class PointageSystem:
             current_time = datetime.now()
             date_str = current_time.strftime('%Y-%m-%d')
             heure_str = current_time.strftime('%H:%M:%S')
-            
-            # Déterminer le type de scan
-            aujourd_hui = self.scans_df[
-                (self.scans_df['Code_Barres'].astype(str) == str(code_barre)) & 
-                (self.scans_df['Date'].astype(str) == date_str)
-            ]
-            
-            type_scan = 'Entrée' if len(aujourd_hui) % 2 == 0 else 'Sortie'
-            
-            # Créer le nouveau scan
-            nouveau_scan = pd.DataFrame([{
-                'ID_Employé': emp['id'],
-                'Nom': emp['nom'],
-                'Prénom': emp['prenom'],
-                'Code_Barres': code_barre,
-                'Date': date_str,
-                'Heure': heure_str,
-                'Type_Scan': type_scan
-            }])
-            
-            # Ajouter le DateTime pour les calculs
-            nouveau_scan['DateTime'] = pd.to_datetime(
-                nouveau_scan['Date'] + ' ' + nouveau_scan['Heure']
-            )
-            
-            # Concaténer avec les données existantes
-            self.scans_df = pd.concat([self.scans_df, nouveau_scan], ignore_index=True)
-            
-            # Sauvegarder immédiatement
-            self.save_scans()
-            
+
+            try:
+                # Lecture, choix du type et écriture sous le verrou partagé avec le service
+                # d'ingestion : un autre pointage du même badge ne peut pas s'intercaler
+                with scans_lock(self.scans_file):
+                    self.refresh_scans()
+
+                    # Déterminer le type de scan
+                    aujourd_hui = self.today_scans[
+                        (self.today_scans['Code_Barres'].astype(str) == str(code_barre)) &
+                        (self.today_scans['Date'].astype(str) == date_str)
+                    ]
+
+                    type_scan = 'Entrée' if len(aujourd_hui) % 2 == 0 else 'Sortie'
+
+                    # Créer le nouveau scan
+                    nouveau_scan = pd.DataFrame([{
+                        'ID_Employé': emp['id'],
+                        'Nom': emp['nom'],
+                        'Prénom': emp['prenom'],
+                        'Code_Barres': code_barre,
+                        'Date': date_str,
+                        'Heure': heure_str,
+                        'Type_Scan': type_scan
+                    }])
+
+                    # Ajouter à la fin du fichier, puis relire la ligne dans today_scans
+                    self._write_scans(nouveau_scan)
+                    self.refresh_scans()
+            except Exception as e:
+                return False, f"Erreur lors de la sauvegarde des pointages: {str(e)}"
+
             return True, f"{type_scan} enregistrée pour {emp['prenom']} {emp['nom']}"
         return False, "Code-barres non reconnu"
 
@@ -172,11 +361,13 @@ class PointageSystem:
             return True, "Sauvegarde créée avec succès"
         except Exception as e:
             return False, f"Erreur lors de la sauvegarde: {str(e)}"
-    def calculate_daily_hours(self, employee_id, date):
+    def calculate_daily_hours(self, employee_id, date, scans=None):
         """Calcule les heures travaillées pour un employé sur une journée donnée"""
-        day_scans = self.scans_df[
-            (self.scans_df['ID_Employé'] == employee_id) & 
-            (self.scans_df['Date'] == date)
+        if scans is None:
+            scans = self.scans_df
+        day_scans = scans[
+            (scans['ID_Employé'] == employee_id) & 
+            (scans['Date'] == date)
         ].sort_values('DateTime')
 
         total_hours = timedelta()
@@ -210,15 +401,15 @@ def show_pointage_page():
 
     with col2:
         st.subheader("Derniers pointages")
-        if not st.session_state.system.scans_df.empty:
-            recent_scans = st.session_state.system.scans_df.tail(5)
+        if not st.session_state.system.today_scans.empty:
+            recent_scans = st.session_state.system.today_scans.tail(5)
             for _, scan in recent_scans.iloc[::-1].iterrows():
                 st.write(f"{scan['Prénom']} {scan['Nom']} - {scan['Type_Scan']} à {scan['Heure']}")
 
 def show_admin_page():
     st.title("Administration")
 
-    tab1, tab2 = st.tabs(["Gestion des Employés", "Liste des Employés"])
+    tab1, tab2, tab3 = st.tabs(["Gestion des Employés", "Liste des Employés", "Archives"])
 
     with tab1:
         st.subheader("Ajouter un nouvel employé")
@@ -247,7 +438,114 @@ def show_admin_page():
             df_employees = pd.DataFrame(st.session_state.system.employees.values())
             st.dataframe(df_employees)
 
+    with tab3:
+        st.subheader("Archivage des mois clos")
+        if archive_available():
+            st.caption("Les pointages des mois clos sont déplacés de scans.csv vers data/archive/.")
+            if st.button("Archiver les mois clos"):
+                success, message = st.session_state.system.archive_scans()
+                if success:
+                    st.success(message)
+                else:
+                    st.error(message)
+        else:
+            st.info("Installez pyarrow pour activer l'archivage : pip install pyarrow")
+
+        st.subheader("Rétention des données")
+        policy = load_policy(st.session_state.system.data_dir)
+        st.caption(
+            f"Pointages bruts conservés {policy['raw_months']} mois, puis résumés par jour "
+            f"et archivés compressés ; résumés et archives supprimés après {policy['summary_years']} ans "
+            f"(data/retention.json)."
+        )
+        if st.button("Appliquer la rétention"):
+            success, message = st.session_state.system.apply_retention()
+            if success:
+                st.success(message)
+            else:
+                st.error(message)
+
+        st.subheader("Export de l'historique")
+        if st.button("Préparer l'export CSV"):
+            st.download_button(
+                label="📥 Télécharger l'historique",
+                data=export_csv(st.session_state.system.data_dir),
+                file_name=f'historique_pointages_{datetime.now().strftime("%Y%m%d")}.csv',
+                mime='text/csv'
+            )
+
+def show_timesheet_page():
+    st.title("Feuille de temps")
+
+    employees = {
+        emp['id']: f"{emp['prenom']} {emp['nom']} ({emp['id']})"
+        for emp in st.session_state.system.employees.values()
+    }
+    if not employees:
+        st.info("Aucun employé enregistré")
+        return
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        employee_id = st.selectbox(
+            "Employé",
+            options=list(employees),
+            format_func=lambda x: employees[x]
+        )
+    with col2:
+        start_date = st.date_input("Du", value=datetime.now() - timedelta(days=90), key="timesheet_start")
+    with col3:
+        end_date = st.date_input("Au", value=datetime.now(), key="timesheet_end")
+
+    # Jours encore en pointages bruts, complétés par les résumés des périodes expirées
+    index = st.session_state.system.scan_index
+    summaries = read_summaries(st.session_state.system.data_dir, start_date, end_date, employee_id)
+    raw_days = index.employee_days(employee_id, start_date, end_date).astype(str).tolist()
+    days = sorted(set(raw_days) | set(summaries['Date']), reverse=True)
+    if len(days) == 0:
+        st.info("Aucun pointage sur cette période")
+        return
+
+    # Pagination par jours travaillés, du plus récent au plus ancien
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page_size = st.selectbox("Jours par page", options=[7, 14, 31, 62], index=2)
+    page_count = (len(days) + page_size - 1) // page_size
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+    page_days = days[(page - 1) * page_size:page * page_size]
+
+    scans = index.employee_scans(employee_id, page_days[-1], page_days[0])
+    df_timesheet = build_timesheet(scans)
+    page_summaries = summaries[summaries['Date'].isin(page_days)]
+    if not page_summaries.empty:
+        df_timesheet = pd.concat([df_timesheet, page_summaries[df_timesheet.columns]], ignore_index=True)
+    df_timesheet = df_timesheet.sort_values('Date', ascending=False)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Heures Travaillées", f"{df_timesheet['Heures Travaillées'].sum():.2f}h")
+    with col2:
+        st.metric("Temps de Pause", f"{df_timesheet['Temps de Pause'].sum():.2f}h")
+    with col3:
+        st.metric("Jours avec anomalies", int((df_timesheet['Anomalies'] != '').sum()))
+
+    st.caption(f"Page {page}/{page_count} - {len(days)} jours travaillés sur la période")
+    st.dataframe(df_timesheet, hide_index=True, use_container_width=True)
+
+def warn_expired_period(start, end):
+    """Avertissement lorsque la période contient des mois retirés par la rétention"""
+    months = summary_months(st.session_state.system.data_dir, start, end)
+    if months:
+        st.warning(
+            f"Les pointages bruts de {', '.join(months)} ont été retirés par la politique de "
+            "rétention : ce rapport ne les inclut pas. Leurs résumés journaliers restent "
+            "consultables dans la Feuille de temps."
+        )
+
 def show_reports_page():
+    import plotly.express as px
+
     st.title("Rapports et Analyses")
 
     tabs = st.tabs(["Journalier", "Hebdomadaire", "Mensuel", "Personnalisé"])
@@ -262,17 +560,19 @@ def show_reports_page():
         if st.button("Générer rapport journalier"):
             date_str = selected_date.strftime('%Y-%m-%d')
             daily_data = []
+            warn_expired_period(selected_date, selected_date)
+            scans = st.session_state.system.get_scans(selected_date, selected_date, REPORT_COLUMNS)
 
             for code_barre, emp in st.session_state.system.employees.items():
                 # Récupérer tous les scans de la journée
-                day_scans = st.session_state.system.scans_df[
-                    (st.session_state.system.scans_df['ID_Employé'] == emp['id']) & 
-                    (st.session_state.system.scans_df['Date'] == date_str)
+                day_scans = scans[
+                    (scans['ID_Employé'] == emp['id']) & 
+                    (scans['Date'] == date_str)
                 ].sort_values('DateTime')
 
                 if not day_scans.empty:
                     # Calculer les heures travaillées
-                    total_hours = st.session_state.system.calculate_daily_hours(emp['id'], date_str)
+                    total_hours = st.session_state.system.calculate_daily_hours(emp['id'], date_str, scans)
 
                     # Calculer le temps de pause
                     pause_time = 0
@@ -351,6 +651,8 @@ def show_reports_page():
             end_of_week = start_of_week + timedelta(days=6)
 
             weekly_data = []
+            warn_expired_period(start_of_week, end_of_week)
+            scans = st.session_state.system.get_scans(start_of_week, end_of_week, REPORT_COLUMNS)
 
             for code_barre, emp in st.session_state.system.employees.items():
                 daily_hours = []
@@ -361,7 +663,7 @@ def show_reports_page():
                 current_date = start_of_week
                 while current_date <= end_of_week:
                     date_str = current_date.strftime('%Y-%m-%d')
-                    hours = st.session_state.system.calculate_daily_hours(emp['id'], date_str)
+                    hours = st.session_state.system.calculate_daily_hours(emp['id'], date_str, scans)
                     daily_hours.append(hours)
                     total_hours += hours
                     current_date += timedelta(days=1)
@@ -445,6 +747,8 @@ def show_reports_page():
                 last_day = datetime(selected_year + 1, 1, 1) - timedelta(days=1)
             else:
                 last_day = datetime(selected_year, selected_month + 1, 1) - timedelta(days=1)
+            warn_expired_period(first_day, last_day)
+            scans = st.session_state.system.get_scans(first_day, last_day, REPORT_COLUMNS)
 
             for code_barre, emp in st.session_state.system.employees.items():
                 total_hours = 0
@@ -453,7 +757,7 @@ def show_reports_page():
 
                 while current_date <= last_day:
                     date_str = current_date.strftime('%Y-%m-%d')
-                    hours = st.session_state.system.calculate_daily_hours(emp['id'], date_str)
+                    hours = st.session_state.system.calculate_daily_hours(emp['id'], date_str, scans)
                     if hours > 0:
                         total_hours += hours
                         worked_days += 1
@@ -536,63 +840,44 @@ def show_reports_page():
             show_presence = st.checkbox("Taux de présence", value=True)
             show_late = st.checkbox("Retards", value=True)
 
+        if st.session_state.pop('custom_report_cancelled', False):
+            st.info("Calcul du rapport annulé")
+
         if st.button("Générer rapport personnalisé"):
             custom_data = []
             total_days = (end_date - start_date).days + 1
+            employees = list(st.session_state.system.employees.values())
+            warn_expired_period(start_date, end_date)
+            # Seuls les mois de la période sont lus, puis répartis par employé
+            scans = st.session_state.system.get_scans(start_date, end_date, REPORT_COLUMNS)
+            scans_by_id = dict(tuple(scans.groupby(scans['ID_Employé'].astype(str), sort=False)))
+
+            # Un clic sur Annuler relance le script, ce qui interrompt le calcul et arrête le pool
+            cancel_placeholder = st.empty()
+            cancel_placeholder.button(
+                "Annuler le calcul",
+                key="cancel_custom_report",
+                on_click=lambda: st.session_state.update(custom_report_cancelled=True)
+            )
+            progress_bar = st.progress(0.0, text="Calcul du rapport...")
+            metrics = compute_employee_metrics(
+                [scans_by_id.get(str(emp['id']), scans.iloc[0:0]) for emp in employees],
+                progress=lambda done, total: progress_bar.progress(
+                    done / total, text=f"Calcul du rapport... {done}/{total} employés"
+                )
+            )
+            progress_bar.empty()
+            cancel_placeholder.empty()
 
-            for code_barre, emp in st.session_state.system.employees.items():
+            for emp, emp_metrics in zip(employees, metrics):
                 emp_data = {
                     'Employé': f"{emp['prenom']} {emp['nom']}",
                     'Jours Période': total_days
                 }
-
-                total_hours = 0
-                total_breaks = 0
-                worked_days = 0
-                late_days = 0
-                current_date = start_date
-
-                while current_date <= end_date:
-                    date_str = current_date.strftime('%Y-%m-%d')
-                    hours = st.session_state.system.calculate_daily_hours(emp['id'], date_str)
-
-                    if hours > 0:
-                        total_hours += hours
-                        worked_days += 1
-
-                        # Vérifier les retards (exemple: arrivée après 9h)
-                        day_scans = st.session_state.system.scans_df[
-                            (st.session_state.system.scans_df['ID_Employé'] == emp['id']) &
-                            (st.session_state.system.scans_df['Date'] == date_str) &
-                            (st.session_state.system.scans_df['Type_Scan'] == 'Entrée')
-                        ]
-
-                        if not day_scans.empty:
-                            first_entry = pd.to_datetime(day_scans.iloc[0]['Heure'])
-                            if first_entry.hour >= 9 and first_entry.minute > 0:
-                                late_days += 1
-
-                        # Calculer les pauses
-                        day_scans = st.session_state.system.scans_df[
-                            (st.session_state.system.scans_df['ID_Employé'] == emp['id']) &
-                            (st.session_state.system.scans_df['Date'] == date_str)
-                        ].sort_values('DateTime')
-
-                        # Calculer les pauses
-                        day_scans = st.session_state.system.scans_df[
-                            (st.session_state.system.scans_df['ID_Employé'] == emp['id']) &
-                            (st.session_state.system.scans_df['Date'] == date_str)
-                        ].sort_values('DateTime')
-
-                        entry_time = None
-                        for _, scan in day_scans.iterrows():
-                            if scan['Type_Scan'] == 'Sortie':
-                                entry_time = pd.to_datetime(scan['Date'] + ' ' + scan['Heure'])
-                            elif scan['Type_Scan'] == 'Entrée' and entry_time is not None:
-                                exit_time = pd.to_datetime(scan['Date'] + ' ' + scan['Heure'])
-                                total_breaks += (exit_time - entry_time).total_seconds() / 3600
-
-                    current_date += timedelta(days=1)
+                total_hours = emp_metrics['total_hours']
+                total_breaks = emp_metrics['total_breaks']
+                worked_days = emp_metrics['worked_days']
+                late_days = emp_metrics['late_days']
 
                 # Calculer toutes les métriques
                 if worked_days > 0:
@@ -748,7 +1033,7 @@ def show_sidebar():
         # Menu de navigation
         pages = ["Pointage"]
         if st.session_state.admin:
-            pages.extend(["Administration", "Rapports"])
+            pages.extend(["Administration", "Feuille de temps", "Rapports"])
 
         page = st.radio("", pages)
 
@@ -777,6 +1062,9 @@ def main():
     # Initialisation du système
     if 'system' not in st.session_state:
         st.session_state.system = PointageSystem()
+    else:
+        # Pointages reçus entre-temps par le service d'ingestion
+        st.session_state.system.refresh_scans()
 
     # Affichage du menu et récupération de la page sélectionnée
     page = show_sidebar()
@@ -787,6 +1075,8 @@ def main():
             show_pointage_page()
         elif page == "Administration" and st.session_state.admin:
             show_admin_page()
+        elif page == "Feuille de temps" and st.session_state.admin:
+            show_timesheet_page()
         elif page == "Rapports" and st.session_state.admin:
             show_reports_page()
     except Exception as e:
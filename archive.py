@@ -0,0 +1,430 @@
+"""Archive en colonnes de l'historique des pointages.
+
+Les mois clos sont déplacés de ``scans.csv`` vers des fichiers Feather (Arrow
+IPC) non compressés, un par mois, dans ``data/archive/``. Les colonnes y sont
+typées (horodatage, catégories) et les fichiers sont lus par projection
+mémoire : un rapport ne charge que les mois et les colonnes dont il a besoin.
+``scans.csv`` ne garde que la période en cours.
+
+pyarrow est optionnel : sans lui, l'historique reste entièrement dans le CSV.
+
+Usage :
+    python archive.py compact --data-dir data
+    python archive.py export --data-dir data --output historique.csv
+"""
+import argparse
+import importlib.util
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SCAN_COLUMNS = ['ID_Employé', 'Nom', 'Prénom', 'Code_Barres', 'Date', 'Heure', 'Type_Scan']
+# Colonnes lues par les rapports et la feuille de temps
+REPORT_COLUMNS = ['ID_Employé', 'Date', 'Heure', 'Type_Scan', 'DateTime']
+CATEGORY_COLUMNS = ['ID_Employé', 'Nom', 'Prénom', 'Code_Barres', 'Date', 'Type_Scan']
+JOURNAL_FILE = "compaction.json"
+JOB_LOCK_FILE = "job.lock"
+INDEX_METADATA_KEY = "pointeuse.index"
+# Verrous de job tenus par le thread courant
+_job_locks = threading.local()
+
+
+class JobRunningError(RuntimeError):
+    """Une compaction ou une rétention est déjà en cours sur ce dossier"""
+
+
+def _lock(f, wait=True):
+    """Verrou exclusif sur le fichier ouvert ; sans attente, BlockingIOError s'il est pris"""
+    if os.name == 'nt':
+        import msvcrt
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                if not wait:
+                    raise BlockingIOError(f.name) from None
+                time.sleep(0.1)
+    else:
+        import fcntl
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            if wait:
+                raise
+            raise BlockingIOError(f.name) from None
+
+
+def _unlock(f):
+    if os.name == 'nt':
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def scans_lock(scans_file):
+    """Verrou inter-processus sur scans.csv.
+
+    Pris par chaque ajout (application, service d'ingestion) et chaque
+    réécriture (compaction, rétention) : une ligne ajoutée pendant une
+    réécriture ne peut pas être perdue.
+    """
+    with open(Path(scans_file).with_suffix('.lock'), 'a+b') as f:
+        _lock(f)
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+
+@contextmanager
+def job_lock(data_dir):
+    """Verrou exclusif d'une compaction ou d'une rétention, pour toute sa durée.
+
+    Échoue immédiatement (JobRunningError) si un autre job tient le verrou.
+    Réentrant dans un même thread : la rétention lance elle-même une compaction.
+    """
+    archive_dir = Path(data_dir) / "archive"
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    lock_path = str((archive_dir / JOB_LOCK_FILE).resolve())
+    held = _job_locks.__dict__.setdefault('held', set())
+    if lock_path in held:
+        yield
+        return
+
+    with open(lock_path, 'a+b') as f:
+        try:
+            _lock(f, wait=False)
+        except BlockingIOError:
+            raise JobRunningError(
+                f"Une compaction ou une rétention est déjà en cours ({lock_path})"
+            ) from None
+        held.add(lock_path)
+        try:
+            yield
+        finally:
+            held.discard(lock_path)
+            _unlock(f)
+
+
+def archive_available():
+    """Indique si pyarrow est installé"""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def _month_path(archive_dir, month):
+    return Path(archive_dir) / f"scans_{month}.feather"
+
+
+def archive_months(archive_dir):
+    """Mois archivés (format AAAA-MM), triés"""
+    return sorted(p.stem[len("scans_"):] for p in Path(archive_dir).glob("scans_*.feather"))
+
+
+def _to_date_str(value):
+    if value is None or isinstance(value, str):
+        return value
+    return value.strftime('%Y-%m-%d')
+
+
+def _read_month(archive_dir, month, columns=None):
+    from pyarrow import feather
+    table = feather.read_table(_month_path(archive_dir, month), columns=columns, memory_map=True)
+    return table.to_pandas()
+
+
+def _index_path(archive_dir, month):
+    return Path(archive_dir) / f"index_{month}.feather"
+
+
+def _build_month_index(scans):
+    """Positions des lignes du mois groupées par employé, dans l'ordre chronologique.
+
+    Retourne le répertoire des employés (identifiants triés, bornes de leurs
+    lignes dans l'index) et les colonnes Position et DateTime de l'index.
+    """
+    ids = scans['ID_Employé'].astype(str).to_numpy()
+    times = scans['DateTime'].to_numpy(dtype='datetime64[ns]')
+    order = np.lexsort((times, ids))
+    employee_ids, starts = np.unique(ids[order], return_index=True)
+    directory = {
+        'rows': len(ids),
+        'ids': employee_ids.tolist(),
+        'offsets': np.append(starts, len(order)).tolist(),
+    }
+    return directory, order.astype('int64'), times[order]
+
+
+def _write_month(archive_dir, month, scans):
+    """Écriture atomique d'un mois avec des colonnes typées, puis de son index"""
+    from pyarrow import feather
+    scans = scans[SCAN_COLUMNS + ['DateTime']]
+    scans = scans.astype({col: 'category' for col in CATEGORY_COLUMNS})
+    scans = scans.astype({'Heure': str})
+    path = _month_path(archive_dir, month)
+    tmp_path = path.with_suffix('.tmp')
+    # Sans compression pour permettre la lecture par projection mémoire
+    feather.write_feather(scans.reset_index(drop=True), tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+    # Index par employé : répertoire dans les métadonnées, positions et horodatages en colonnes
+    import pyarrow as pa
+    directory, positions, times = _build_month_index(scans)
+    index = pa.table({'Position': positions, 'DateTime': times})
+    index = index.replace_schema_metadata({INDEX_METADATA_KEY: json.dumps(directory)})
+    index_path = _index_path(archive_dir, month)
+    tmp_path = index_path.with_name(index_path.name + '.tmp')
+    # Un seul bloc : les colonnes se lisent sans copie
+    feather.write_feather(index, tmp_path, compression='uncompressed', chunksize=max(len(positions), 1))
+    os.replace(tmp_path, index_path)
+
+
+def remove_month(archive_dir, month):
+    """Suppression d'un mois de l'archive"""
+    _month_path(archive_dir, month).unlink(missing_ok=True)
+    _index_path(archive_dir, month).unlink(missing_ok=True)
+
+
+class MonthIndex:
+    """Index par employé d'un mois archivé, lu depuis son fichier ``index_AAAA-MM.feather``.
+
+    Le mois et son index sont projetés en mémoire : retrouver les pointages
+    d'un employé est une recherche dichotomique parmi les employés du mois,
+    puis la lecture de ses seules lignes. Un index absent ou périmé (mois
+    écrit avant l'index, écriture interrompue) est reconstruit depuis le mois.
+    """
+
+    def __init__(self, archive_dir, month):
+        from pyarrow import feather
+        self.table = feather.read_table(_month_path(archive_dir, month), memory_map=True)
+        index_path = _index_path(archive_dir, month)
+        directory = None
+        if index_path.exists():
+            index = feather.read_table(index_path, memory_map=True)
+            directory = json.loads(index.schema.metadata[INDEX_METADATA_KEY.encode()])
+        if directory is not None and directory['rows'] == self.table.num_rows:
+            # Colonnes sans valeur manquante : vues directes sur le fichier projeté
+            self.positions = index['Position'].to_numpy()
+            self.times = index['DateTime'].to_numpy()
+        else:
+            directory, self.positions, self.times = _build_month_index(
+                self.table.select(['ID_Employé', 'DateTime']).to_pandas()
+            )
+        self.ids = np.array(directory['ids'], dtype=str)
+        self.offsets = directory['offsets']
+
+    def employee(self, employee_id):
+        """Positions et horodatages des pointages d'un employé, ou None"""
+        i = np.searchsorted(self.ids, str(employee_id))
+        if i == len(self.ids) or self.ids[i] != str(employee_id):
+            return None
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return self.positions[lo:hi], self.times[lo:hi]
+
+    def rows(self, positions, columns=REPORT_COLUMNS):
+        """Lignes du mois aux positions données"""
+        return self.table.select(columns).take(positions).to_pandas()
+
+
+def month_index(archive_dir, month):
+    """Index par employé d'un mois archivé, ou None si le mois n'est pas archivé"""
+    if not _month_path(archive_dir, month).exists():
+        return None
+    return MonthIndex(archive_dir, month)
+
+
+def read_archive(archive_dir, start=None, end=None, columns=None):
+    """Lecture des pointages archivés entre deux dates incluses.
+
+    Seuls les fichiers des mois concernés et les colonnes demandées sont lus.
+    """
+    start, end = _to_date_str(start), _to_date_str(end)
+    months = [
+        m for m in archive_months(archive_dir)
+        if (start is None or m >= start[:7]) and (end is None or m <= end[:7])
+    ]
+    read_columns = None if columns is None else list(dict.fromkeys(list(columns) + ['DateTime']))
+    frames = [_read_month(archive_dir, m, read_columns) for m in months]
+    if not frames:
+        return pd.DataFrame(columns=columns or SCAN_COLUMNS + ['DateTime'])
+
+    scans = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    mask = pd.Series(True, index=scans.index)
+    if start is not None:
+        mask &= scans['DateTime'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= scans['DateTime'] < pd.Timestamp(end) + pd.Timedelta(days=1)
+    if not mask.all():
+        scans = scans[mask].reset_index(drop=True)
+    return scans if columns is None else scans[list(columns)]
+
+
+def read_csv_snapshot(scans_file):
+    """Lecture de scans.csv jusqu'à la dernière ligne complète.
+
+    Retourne les pointages (colonnes texte) et la taille lue, à passer à
+    ``replace_csv``.
+    """
+    with open(scans_file, 'rb') as f:
+        data = f.read()
+    # Une ligne en cours d'écriture reste dans le CSV
+    size = data.rfind(b'\n') + 1
+    scans = pd.read_csv(BytesIO(data[:size]), dtype=str, keep_default_na=False)
+    return scans, size
+
+
+def replace_csv(scans_file, scans, size):
+    """Réécriture de scans.csv, lignes ajoutées depuis la lecture comprises"""
+    scans_file = Path(scans_file)
+    tmp_file = scans_file.with_suffix('.tmp')
+    scans.to_csv(tmp_file, index=False, encoding='utf-8', lineterminator='\n')
+    # Aucun ajout possible entre la copie de la fin du fichier et le remplacement
+    with scans_lock(scans_file):
+        with open(scans_file, 'rb') as src, open(tmp_file, 'ab') as dst:
+            src.seek(size)
+            dst.write(src.read())
+        os.replace(tmp_file, scans_file)
+
+
+def _recover(archive_dir, scans_file):
+    """Annulation d'une compaction interrompue avant la réécriture du CSV"""
+    journal_path = Path(archive_dir) / JOURNAL_FILE
+    if not journal_path.exists():
+        return
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        journal = json.load(f)
+
+    with scans_lock(scans_file):
+        dates = pd.read_csv(scans_file, usecols=['Date'], dtype=str)['Date']
+        if (dates < journal['before']).any():
+            # Le CSV contient encore les pointages : retour à l'archive d'avant
+            for month, previous_rows in journal['months'].items():
+                path = _month_path(archive_dir, month)
+                if not path.exists():
+                    continue
+                if previous_rows == 0:
+                    path.unlink()
+                else:
+                    # Les lignes ajoutées par la compaction interrompue sont en fin de fichier
+                    scans = _read_month(archive_dir, month)
+                    if len(scans) > previous_rows:
+                        _write_month(archive_dir, month, scans.iloc[:previous_rows])
+        journal_path.unlink()
+
+
+def compact_scans(data_dir="data", before=None):
+    """Déplacement des pointages antérieurs à ``before`` vers l'archive.
+
+    Par défaut, ``before`` est le premier jour du mois en cours : seuls les
+    mois clos sont archivés. Une compaction interrompue est annulée au
+    lancement suivant, puis reprise. Retourne le nombre de pointages archivés ;
+    lève JobRunningError si une compaction ou une rétention est en cours.
+    """
+    # Deux compactions simultanées dupliqueraient les lignes archivées
+    with job_lock(data_dir):
+        return _compact_scans(Path(data_dir), before)
+
+
+def _compact_scans(data_dir, before):
+    scans_file = data_dir / "scans.csv"
+    archive_dir = data_dir / "archive"
+    if not scans_file.exists():
+        return 0
+    _recover(archive_dir, scans_file)
+
+    if before is None:
+        before = date.today().replace(day=1)
+    before = _to_date_str(before)
+
+    scans, size = read_csv_snapshot(scans_file)
+    expired = scans['Date'] < before
+    if not expired.any():
+        return 0
+
+    archived = scans[expired].copy()
+    archived['DateTime'] = pd.to_datetime(archived['Date'] + ' ' + archived['Heure'])
+    archived['Mois'] = archived['Date'].str[:7]
+
+    existing = set(archive_months(archive_dir))
+    groups = dict(tuple(archived.groupby('Mois', sort=True)))
+    journal = {
+        'before': before,
+        'months': {
+            month: len(_read_month(archive_dir, month, ['DateTime'])) if month in existing else 0
+            for month in groups
+        }
+    }
+    journal_path = archive_dir / JOURNAL_FILE
+    with open(journal_path, 'w', encoding='utf-8') as f:
+        json.dump(journal, f)
+
+    for month, rows in groups.items():
+        rows = rows.drop(columns='Mois')
+        if month in existing:
+            rows = pd.concat([_read_month(archive_dir, month), rows], ignore_index=True)
+        _write_month(archive_dir, month, rows)
+
+    replace_csv(scans_file, scans[~expired], size)
+    journal_path.unlink()
+    return int(expired.sum())
+
+
+def export_csv(data_dir="data", output=None, start=None, end=None):
+    """Export CSV de l'historique (archive et période en cours)"""
+    data_dir = Path(data_dir)
+    frames = []
+    if archive_available() and (data_dir / "archive").exists():
+        frames.append(read_archive(data_dir / "archive", start, end, SCAN_COLUMNS))
+    current = pd.read_csv(data_dir / "scans.csv", dtype=str, keep_default_na=False)
+    start, end = _to_date_str(start), _to_date_str(end)
+    if start is not None:
+        current = current[current['Date'] >= start]
+    if end is not None:
+        current = current[current['Date'] <= end]
+    frames.append(current)
+    scans = pd.concat(frames, ignore_index=True)
+    return scans.to_csv(output, index=False, encoding='utf-8', lineterminator='\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive de l'historique des pointages")
+    parser.add_argument('--data-dir', default='data')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    compact = sub.add_parser('compact', help="Archiver les mois clos")
+    compact.add_argument('--before', help="Archiver les pointages antérieurs à cette date (AAAA-MM-JJ)")
+
+    export = sub.add_parser('export', help="Exporter l'historique en CSV")
+    export.add_argument('--output', required=True)
+    export.add_argument('--start')
+    export.add_argument('--end')
+    args = parser.parse_args()
+
+    if args.command == 'compact':
+        if not archive_available():
+            parser.error("pyarrow est requis pour l'archive : pip install pyarrow")
+        try:
+            count = compact_scans(args.data_dir, args.before)
+        except JobRunningError as e:
+            parser.exit(1, f"{e}\n")
+        print(f"{count} pointages archivés")
+    else:
+        export_csv(args.data_dir, args.output, args.start, args.end)
+        print(f"Historique exporté dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Test de charge local du service d'ingestion des pointages.
+
+Sans --url, démarre le service sur un dossier temporaire peuplé d'employés
+fictifs, puis envoie des lots de pointages depuis plusieurs clients gardant
+leur connexion ouverte.
+
+Usage :
+    python benchmarks/ingest_load_test.py --clients 4 --requests 500 --batch 50
+    python benchmarks/ingest_load_test.py --url http://127.0.0.1:8502 --codes 123,456 --token ...
+"""
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ingest_server import TOKEN_ENV, TOKEN_HEADER, create_server  # noqa: E402
+
+
+def create_employees(data_dir, count):
+    """Création d'employés fictifs dans employees.json"""
+    employees = {
+        str(100000 + i): {
+            'id': f"E{i:05d}",
+            'nom': f"Nom{i}",
+            'prenom': f"Prenom{i}",
+            'code_barre': str(100000 + i),
+            'actif': True
+        }
+        for i in range(count)
+    }
+    with open(Path(data_dir) / "employees.json", 'w', encoding='utf-8') as f:
+        json.dump(employees, f, indent=4, ensure_ascii=False)
+    return list(employees)
+
+
+def run_client(host, port, codes, offset, requests, batch, latencies, errors, token=None):
+    """Envoi de lots de pointages sur une seule connexion keep-alive"""
+    conn = http.client.HTTPConnection(host, port)
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers[TOKEN_HEADER] = token
+    for i in range(requests):
+        start = offset + i * batch
+        scans = [codes[(start + j) % len(codes)] for j in range(batch)]
+        body = json.dumps({'scans': scans})
+        t0 = time.perf_counter()
+        conn.request('POST', '/scans', body=body, headers=headers)
+        response = conn.getresponse()
+        payload = json.loads(response.read())
+        latencies.append(time.perf_counter() - t0)
+        if response.status != 200:
+            errors.append(payload)
+        else:
+            errors.extend(r for r in payload['results'] if not r['success'])
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge du service d'ingestion")
+    parser.add_argument('--url', help="Service existant (par défaut : serveur local temporaire)")
+    parser.add_argument('--codes', help="Codes-barres à utiliser avec --url, séparés par des virgules")
+    parser.add_argument('--token', default=os.environ.get(TOKEN_ENV),
+                        help=f"Jeton d'accès du service (par défaut : {TOKEN_ENV})")
+    parser.add_argument('--employees', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=250, help="Requêtes par client")
+    parser.add_argument('--batch', type=int, default=50, help="Pointages par requête")
+    args = parser.parse_args()
+
+    server = None
+    tmp_dir = None
+    if args.url:
+        if not args.codes:
+            parser.error("--codes est requis avec --url")
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port or 80
+        codes = args.codes.split(',')
+    else:
+        tmp_dir = tempfile.TemporaryDirectory()
+        codes = create_employees(tmp_dir.name, args.employees)
+        server = create_server('127.0.0.1', 0, tmp_dir.name, args.token)
+        host, port = server.server_address
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    latencies = []
+    errors = []
+    threads = [
+        threading.Thread(
+            target=run_client,
+            args=(host, port, codes, c * args.requests * args.batch,
+                  args.requests, args.batch, latencies, errors, args.token)
+        )
+        for c in range(args.clients)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    total = args.clients * args.requests * args.batch
+    latencies.sort()
+    print(f"Pointages envoyés : {total} ({args.clients} clients, lots de {args.batch})")
+    print(f"Durée : {elapsed:.2f}s - {total / elapsed:.0f} pointages/s")
+    print(f"Latence par requête : médiane {latencies[len(latencies) // 2] * 1000:.1f}ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms")
+    print(f"Erreurs : {len(errors)}")
+
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
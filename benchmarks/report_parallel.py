@@ -0,0 +1,56 @@
+"""Rapport personnalisé : calcul en série contre pool de processus.
+
+Génère un historique fictif, calcule les métriques de tous les employés en
+série puis en parallèle, et vérifie que les deux résultats sont identiques.
+
+Usage :
+    python benchmarks/report_parallel.py --employees 500 --days 365 --workers 4
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from archive import REPORT_COLUMNS  # noqa: E402
+from reports import compute_employee_metrics  # noqa: E402
+from startup import create_history  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rapport personnalisé en série et en parallèle")
+    parser.add_argument('--employees', type=int, default=500)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = Path(tmp_dir) / "data"
+        create_history(data_dir, args.employees, args.days)
+        scans = pd.read_csv(data_dir / "scans.csv", dtype={'ID_Employé': str, 'Code_Barres': str})
+    scans['DateTime'] = pd.to_datetime(scans['Date'] + ' ' + scans['Heure'])
+    groups = dict(tuple(scans[REPORT_COLUMNS].groupby('ID_Employé', sort=False)))
+    per_employee = [groups[f"E{i:05d}"] for i in range(args.employees)]
+    print(f"Historique : {len(scans)} pointages, {args.employees} employés")
+
+    t0 = time.perf_counter()
+    serial = compute_employee_metrics(per_employee, workers=1)
+    t_serial = time.perf_counter() - t0
+    print(f"     série : {t_serial:.2f}s")
+
+    t0 = time.perf_counter()
+    parallel = compute_employee_metrics(per_employee, workers=args.workers)
+    t_parallel = time.perf_counter() - t0
+    print(f"  parallèle : {t_parallel:.2f}s ({args.workers} processus, x{t_serial / t_parallel:.1f})")
+
+    if parallel != serial:
+        sys.exit("Les résultats en série et en parallèle diffèrent")
+    print("Résultats identiques")
+
+
+if __name__ == "__main__":
+    main()
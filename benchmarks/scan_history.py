@@ -0,0 +1,81 @@
+"""Temps de chargement de l'historique : CSV contre archive en colonnes.
+
+Génère un historique fictif, mesure la lecture d'origine (read_csv puis
+to_datetime sur Date + Heure), archive les mois clos, puis mesure la lecture
+de l'archive complète et celle d'un seul mois réduit aux colonnes des rapports.
+
+Usage :
+    python benchmarks/scan_history.py --employees 200 --days 365
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from archive import (REPORT_COLUMNS, archive_available, archive_months, compact_scans,  # noqa: E402
+                     read_archive)
+from startup import create_history  # noqa: E402
+
+
+def measure(label, func, runs):
+    timings = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - t0)
+    print(f"{label:>36} : médiane {statistics.median(timings) * 1000:8.1f}ms "
+          f"({len(result)} lignes)")
+
+
+def load_csv(scans_file):
+    scans = pd.read_csv(scans_file)
+    scans['DateTime'] = pd.to_datetime(scans['Date'] + ' ' + scans['Heure'])
+    return scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chargement de l'historique : CSV contre archive")
+    parser.add_argument('--employees', type=int, default=200)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    if not archive_available():
+        sys.exit("pyarrow est requis : pip install pyarrow")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = Path(tmp_dir) / "data"
+        create_history(data_dir, args.employees, args.days)
+        scans_file = data_dir / "scans.csv"
+        print(f"Historique : {args.employees * args.days * 4} pointages "
+              f"({scans_file.stat().st_size / 1e6:.1f} Mo en CSV)")
+
+        measure("CSV complet (avant)", lambda: load_csv(scans_file), args.runs)
+
+        t0 = time.perf_counter()
+        count = compact_scans(data_dir)
+        print(f"Archivage de {count} pointages : {(time.perf_counter() - t0) * 1000:.0f}ms")
+
+        archive_dir = data_dir / "archive"
+        size = sum(p.stat().st_size for p in archive_dir.glob("*.feather"))
+        print(f"Archive : {size / 1e6:.1f} Mo, CSV restant : {scans_file.stat().st_size / 1e6:.2f} Mo")
+
+        month = archive_months(archive_dir)[-1]
+        month_end = pd.Period(month).end_time.strftime('%Y-%m-%d')
+        measure("archive complète", lambda: read_archive(archive_dir), args.runs)
+        measure("archive complète, colonnes rapports",
+                lambda: read_archive(archive_dir, columns=REPORT_COLUMNS), args.runs)
+        measure(f"mois {month}, colonnes rapports",
+                lambda: read_archive(archive_dir, f"{month}-01", month_end, REPORT_COLUMNS),
+                args.runs)
+        measure("CSV restant (période en cours)", lambda: load_csv(scans_file), args.runs)
+
+
+if __name__ == "__main__":
+    main()
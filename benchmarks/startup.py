@@ -0,0 +1,102 @@
+"""Mesure du temps de démarrage jusqu'au premier pointage.
+
+Génère un historique fictif dans un dossier temporaire, puis mesure dans un
+processus neuf : l'import de app.py, la création de PointageSystem, le premier
+pointage et, à part, le premier accès à l'historique complet (page Rapports).
+
+Usage :
+    python benchmarks/startup.py --employees 200 --days 365 --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MEASURE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+system = app.PointageSystem()
+t2 = time.perf_counter()
+system.record_scan(sys.argv[1])
+t3 = time.perf_counter()
+len(system.scans_df)
+t4 = time.perf_counter()
+print(json.dumps({
+    'import': t1 - t0,
+    'init': t2 - t1,
+    'premier_pointage': t3 - t0,
+    'historique': t4 - t3,
+}))
+"""
+
+
+def create_history(data_dir, employees, days):
+    """Création d'employés et de 4 pointages par employé et par jour"""
+    data_dir = Path(data_dir)
+    data_dir.mkdir(exist_ok=True)
+    emps = {
+        str(100000 + i): {
+            'id': f"E{i:05d}",
+            'nom': f"Nom{i}",
+            'prenom': f"Prenom{i}",
+            'code_barre': str(100000 + i),
+            'actif': True
+        }
+        for i in range(employees)
+    }
+    with open(data_dir / "employees.json", 'w', encoding='utf-8') as f:
+        json.dump(emps, f, indent=4, ensure_ascii=False)
+
+    start = datetime.now().date() - timedelta(days=days)
+    with open(data_dir / "scans.csv", 'w', encoding='utf-8') as f:
+        f.write("ID_Employé,Nom,Prénom,Code_Barres,Date,Heure,Type_Scan\n")
+        for d in range(days):
+            date_str = (start + timedelta(days=d)).strftime('%Y-%m-%d')
+            for heure, type_scan in (('08:30:00', 'Entrée'), ('12:00:00', 'Sortie'),
+                                     ('13:00:00', 'Entrée'), ('17:30:00', 'Sortie')):
+                for code, emp in emps.items():
+                    f.write(f"{emp['id']},{emp['nom']},{emp['prenom']},{code},"
+                            f"{date_str},{heure},{type_scan}\n")
+    return next(iter(emps))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de démarrage jusqu'au premier pointage")
+    parser.add_argument('--employees', type=int, default=200)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        code = create_history(Path(tmp_dir) / "data", args.employees, args.days)
+        size = (Path(tmp_dir) / "data" / "scans.csv").stat().st_size
+        print(f"Historique : {args.employees * args.days * 4} pointages ({size / 1e6:.1f} Mo)")
+
+        env = dict(os.environ, PYTHONPATH=str(ROOT))
+        results = []
+        for _ in range(args.runs):
+            # Chaque mesure part d'une copie propre du CSV
+            create_history(Path(tmp_dir) / "data", args.employees, args.days)
+            out = subprocess.run(
+                [sys.executable, '-W', 'ignore', '-c', MEASURE, code],
+                cwd=tmp_dir, env=env, capture_output=True, text=True, check=True
+            )
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    for key in ('import', 'init', 'premier_pointage', 'historique'):
+        values = [r[key] for r in results]
+        print(f"{key:>17} : médiane {statistics.median(values) * 1000:8.1f}ms "
+              f"(min {min(values) * 1000:.1f}ms)")
+
+
+if __name__ == "__main__":
+    main()
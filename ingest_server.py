@@ -0,0 +1,279 @@
+"""Service HTTP léger d'ingestion des pointages.
+
+Expose la sémantique de ``PointageSystem.record_scan`` en HTTP/JSON sans
+passer par Streamlit, pour les terminaux matériels et les scripts. Le service
+partage les fichiers de ``data/`` avec l'application : les employés sont lus
+depuis ``employees.json`` et les pointages sont ajoutés à la fin de
+``scans.csv``.
+
+Par défaut le service n'écoute que sur la machine locale. Pour l'ouvrir au
+réseau, définir ``POINTAGE_INGEST_TOKEN`` (environnement ou fichier ``.env``) :
+chaque POST doit alors porter ce jeton dans l'en-tête ``X-Pointage-Token``.
+
+Usage :
+    python ingest_server.py --port 8502
+    POINTAGE_INGEST_TOKEN=... python ingest_server.py --host 0.0.0.0 --port 8502
+
+Endpoints :
+    POST /scans   {"code_barre": "123"} ou {"scans": ["123", "456", ...]}
+    GET  /health
+"""
+import argparse
+import csv
+import hmac
+import io
+import ipaddress
+import json
+import os
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from archive import SCAN_COLUMNS, scans_lock
+
+MAX_BODY_SIZE = 10 * 1024 * 1024
+TOKEN_ENV = "POINTAGE_INGEST_TOKEN"
+TOKEN_HEADER = "X-Pointage-Token"
+
+
+class ScanStore:
+    """Enregistrement des pointages directement dans les fichiers partagés"""
+
+    def __init__(self, data_dir="data"):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        self.employees_file = self.data_dir / "employees.json"
+        self.scans_file = self.data_dir / "scans.csv"
+        self.lock = threading.Lock()
+        self.employees = {}
+        self._employees_mtime = None
+        # Nombre de pointages du jour par code-barres, pour alterner Entrée/Sortie
+        self._day = None
+        self._day_counts = {}
+        self._scans_offset = 0
+        self._scans_ino = None
+        if not self.scans_file.exists():
+            with open(self.scans_file, 'w', encoding='utf-8', newline='') as f:
+                csv.writer(f, lineterminator='\n').writerow(SCAN_COLUMNS)
+
+    def _refresh_employees(self):
+        """Relecture de employees.json lorsqu'il a été modifié par l'application"""
+        try:
+            mtime = self.employees_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            self.employees = {}
+            self._employees_mtime = None
+            return
+        if mtime != self._employees_mtime:
+            try:
+                with open(self.employees_file, 'r', encoding='utf-8') as f:
+                    employees = json.load(f)
+            except ValueError:
+                # Fichier en cours d'écriture : liste précédente, nouvel essai à la prochaine requête
+                return
+            self.employees = employees
+            self._employees_mtime = mtime
+
+    def _refresh_counts(self, date_str):
+        """Mise à jour des compteurs du jour à partir des lignes ajoutées au CSV"""
+        stat = self.scans_file.stat()
+        size = stat.st_size
+        if date_str != self._day or size < self._scans_offset or stat.st_ino != self._scans_ino:
+            # Nouveau jour ou fichier réécrit (remplacé par la compaction) : relecture complète
+            self._day = date_str
+            self._day_counts = {}
+            self._scans_offset = 0
+            self._scans_ino = stat.st_ino
+        if size == self._scans_offset:
+            return
+
+        with open(self.scans_file, 'rb') as f:
+            f.seek(self._scans_offset)
+            chunk = f.read(size - self._scans_offset)
+        # Une ligne en cours d'écriture par un autre processus est lue au prochain passage
+        end = chunk.rfind(b'\n') + 1
+        if end == 0:
+            return
+        lines = chunk[:end].decode('utf-8').splitlines()
+        if self._scans_offset == 0:
+            lines = lines[1:]  # En-tête
+        self._scans_offset += end
+        for row in csv.reader(lines):
+            if len(row) >= len(SCAN_COLUMNS) and row[4] == date_str:
+                self._day_counts[row[3]] = self._day_counts.get(row[3], 0) + 1
+
+    def record_scans(self, codes):
+        """Enregistrement d'un lot de pointages, écrit en un seul ajout au CSV"""
+        results = []
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        # Verrou entre threads, puis verrou du fichier partagé avec l'application et la compaction
+        with self.lock, scans_lock(self.scans_file):
+            current_time = datetime.now()
+            date_str = current_time.strftime('%Y-%m-%d')
+            heure_str = current_time.strftime('%H:%M:%S')
+            self._refresh_employees()
+            self._refresh_counts(date_str)
+            pending = {}
+
+            for code_barre in codes:
+                code_barre = str(code_barre)
+                emp = self.employees.get(code_barre)
+                if emp is None:
+                    results.append({'success': False, 'message': "Code-barres non reconnu"})
+                    continue
+                if not emp['actif']:
+                    results.append({'success': False, 'message': "Employé inactif"})
+                    continue
+
+                count = self._day_counts.get(code_barre, 0) + pending.get(code_barre, 0)
+                type_scan = 'Entrée' if count % 2 == 0 else 'Sortie'
+                pending[code_barre] = pending.get(code_barre, 0) + 1
+                writer.writerow([emp['id'], emp['nom'], emp['prenom'], code_barre,
+                                 date_str, heure_str, type_scan])
+                results.append({
+                    'success': True,
+                    'message': f"{type_scan} enregistrée pour {emp['prenom']} {emp['nom']}",
+                    'type_scan': type_scan,
+                })
+
+            if pending:
+                with open(self.scans_file, 'ab') as f:
+                    f.write(buffer.getvalue().encode('utf-8'))
+                # Relecture de nos propres lignes et de celles ajoutées par l'application
+                self._refresh_counts(date_str)
+        return results
+
+    def record_scan(self, code_barre):
+        """Enregistrement d'un pointage, même retour que PointageSystem.record_scan"""
+        result = self.record_scans([code_barre])[0]
+        return result['success'], result['message']
+
+
+class ScanRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 pour garder les connexions ouvertes entre les requêtes
+    protocol_version = "HTTP/1.1"
+    server_version = "PointageIngest/1.0"
+    # En-têtes et corps sont écrits séparément : sans TCP_NODELAY chaque réponse attend l'ACK différé
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        else:
+            self._send_json(404, {'error': "Ressource introuvable"})
+
+    def do_POST(self):
+        if self.path != '/scans':
+            self._send_json(404, {'error': "Ressource introuvable"})
+            return
+        token = self.server.token
+        if token is not None and not hmac.compare_digest(
+                (self.headers.get(TOKEN_HEADER) or '').encode('utf-8'), token.encode('utf-8')):
+            self.close_connection = True
+            self._send_json(401, {'error': "Jeton d'accès invalide"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = 0
+        if length <= 0 or length > MAX_BODY_SIZE:
+            # Corps non lu : la connexion ne peut pas servir à la requête suivante
+            self.close_connection = True
+            self._send_json(400, {'error': "Corps de requête invalide"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(length).decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            self.close_connection = True
+            self._send_json(400, {'error': "JSON invalide"})
+            return
+
+        single = False
+        if isinstance(payload, dict) and isinstance(payload.get('scans'), list):
+            codes = payload['scans']
+        elif isinstance(payload, dict) and 'code_barre' in payload:
+            codes = [payload['code_barre']]
+            single = True
+        else:
+            self.close_connection = True
+            self._send_json(400, {'error': "Champ 'code_barre' ou 'scans' attendu"})
+            return
+
+        try:
+            results = self.server.store.record_scans(codes)
+        except Exception as e:
+            # Le terminal reçoit une réponse au lieu d'une connexion coupée
+            self._send_json(500, {'error': f"Erreur lors de l'enregistrement : {e}"})
+            return
+        if single:
+            self._send_json(200, results[0])
+        else:
+            self._send_json(200, {'results': results})
+
+    def log_message(self, format, *args):
+        # Pas de journalisation par requête : elle coûte plus cher que le pointage
+        pass
+
+
+def is_local(host):
+    """Indique si l'adresse d'écoute n'est joignable que depuis la machine"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def create_server(host="127.0.0.1", port=8502, data_dir="data", token=None):
+    """Création du serveur d'ingestion sur le dossier de données donné.
+
+    Avec ``token``, les POST sans l'en-tête X-Pointage-Token correspondant
+    sont refusés (401).
+    """
+    server = ThreadingHTTPServer((host, port), ScanRequestHandler)
+    server.daemon_threads = True
+    server.store = ScanStore(data_dir)
+    server.token = token
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service d'ingestion des pointages")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--data-dir', default='data')
+    args = parser.parse_args()
+
+    load_dotenv()
+    token = os.environ.get(TOKEN_ENV) or None
+    if token is None and not is_local(args.host):
+        parser.error(f"{TOKEN_ENV} doit être défini pour écouter sur {args.host}")
+
+    server = create_server(args.host, args.port, args.data_dir, token)
+    print(f"Service d'ingestion démarré sur http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
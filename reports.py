@@ -0,0 +1,133 @@
+"""Calcul des métriques de rapport par employé, en série ou en parallèle.
+
+Les employés sont répartis en lots contigus, calculés dans un pool de
+processus, puis les résultats sont remis dans l'ordre des employés : le
+calcul parallèle donne exactement le même résultat que le calcul en série.
+Ce module n'importe pas Streamlit pour que les processus du pool restent
+légers.
+"""
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from timesheet import LATE_HOUR
+
+# En dessous, le démarrage des processus coûte plus cher que le calcul
+PARALLEL_MIN_SCANS = 1_000_000
+CHUNKS_PER_WORKER = 4
+NS_PER_SECOND = 1_000_000_000
+
+
+def employee_metrics(scans):
+    """Heures, pauses, jours travaillés et retards d'un employé sur une période.
+
+    Même règles que le rapport personnalisé : une journée compte si des
+    heures y sont travaillées, un retard est une première entrée après 9h.
+    Les pointages sont parcourus une seule fois, dans l'ordre chronologique.
+    """
+    total_hours = 0
+    total_breaks = 0
+    worked_days = 0
+    late_days = 0
+
+    scans = scans.sort_values('DateTime', kind='stable')
+    dates = scans['Date'].astype(str).tolist()
+    entries = (scans['Type_Scan'] == 'Entrée').tolist()
+    exits = (scans['Type_Scan'] == 'Sortie').tolist()
+    times = scans['DateTime'].to_numpy(dtype='datetime64[ns]').astype('int64').tolist()
+
+    start = 0
+    while start < len(dates):
+        end = start
+        while end < len(dates) and dates[end] == dates[start]:
+            end += 1
+
+        # Heures travaillées : chaque sortie ferme l'entrée précédente
+        worked = 0
+        entry_time = None
+        for i in range(start, end):
+            if entries[i]:
+                entry_time = times[i]
+            elif exits[i] and entry_time is not None:
+                worked += times[i] - entry_time
+                entry_time = None
+        hours = worked / NS_PER_SECOND / 3600
+
+        if hours > 0:
+            total_hours += hours
+            worked_days += 1
+
+            first_entry = next((times[i] for i in range(start, end) if entries[i]), None)
+            if first_entry is not None:
+                first_entry = pd.Timestamp(first_entry)
+                if first_entry.hour >= LATE_HOUR and first_entry.minute > 0:
+                    late_days += 1
+
+            # Pauses : de la dernière sortie à chaque entrée suivante
+            exit_time = None
+            for i in range(start, end):
+                if exits[i]:
+                    exit_time = times[i]
+                elif entries[i] and exit_time is not None:
+                    total_breaks += (times[i] - exit_time) / NS_PER_SECOND / 3600
+        start = end
+
+    return {
+        'total_hours': total_hours,
+        'total_breaks': total_breaks,
+        'worked_days': worked_days,
+        'late_days': late_days,
+    }
+
+
+def _compute_chunk(chunk):
+    return [employee_metrics(scans) for scans in chunk]
+
+
+def compute_employee_metrics(scans_by_employee, workers=None, progress=None):
+    """Métriques de chaque employé, dans l'ordre de ``scans_by_employee``.
+
+    ``progress(done, total)`` est appelé après chaque employé et, en
+    parallèle, au moins toutes les demi-secondes. Une exception levée par
+    ``progress`` (par exemple quand Streamlit interrompt le script pour une
+    nouvelle exécution) abandonne les lots restants et arrête le pool.
+    """
+    total = len(scans_by_employee)
+    if workers is None:
+        scan_count = sum(len(scans) for scans in scans_by_employee)
+        workers = (os.cpu_count() or 1) if scan_count >= PARALLEL_MIN_SCANS else 1
+    workers = min(workers, total)
+
+    if workers <= 1:
+        results = []
+        for scans in scans_by_employee:
+            results.append(employee_metrics(scans))
+            if progress is not None:
+                progress(len(results), total)
+        return results
+
+    # Lots contigus : la fusion par numéro de lot rétablit l'ordre des employés
+    chunk_size = max(1, -(-total // (workers * CHUNKS_PER_WORKER)))
+    chunks = [scans_by_employee[i:i + chunk_size] for i in range(0, total, chunk_size)]
+    chunk_results = [None] * len(chunks)
+    done = 0
+
+    # spawn : pas de fork d'un processus Streamlit qui a déjà des threads
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        pending = {pool.submit(_compute_chunk, chunk): i for i, chunk in enumerate(chunks)}
+        while pending:
+            finished, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = pending.pop(future)
+                chunk_results[i] = future.result()
+                done += len(chunks[i])
+            # Appelé même sans lot terminé : Streamlit ne peut interrompre le script que sur un appel st
+            if progress is not None:
+                progress(done, total)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return [metrics for chunk in chunk_results for metrics in chunk]
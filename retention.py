@@ -0,0 +1,225 @@
+"""Rétention des pointages : résumés journaliers, archives compressées et purge.
+
+Politique (``data/retention.json``, valeurs par défaut ci-dessous) :
+    raw_months     durée de conservation des pointages bruts dans l'application
+    summary_years  durée de conservation des résumés journaliers et des archives
+
+Pour chaque mois expiré, le job écrit d'abord les résumés journaliers par
+employé (``data/summaries/daily_AAAA-MM.csv.gz``), puis l'archive compressée
+des pointages bruts (``data/archive/expired/scans_AAAA-MM.csv.gz``), et ne
+retire qu'ensuite le mois des données de l'application. Chaque étape remplace
+son fichier de façon atomique : un job interrompu reprend au mois non
+terminé, et relancer le job ne traite que les mois nouvellement expirés.
+
+Usage :
+    python retention.py --data-dir data
+    python retention.py --data-dir data --raw-months 6 --summary-years 3 --max-months 2
+"""
+import argparse
+import json
+import os
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from archive import (SCAN_COLUMNS, JobRunningError, archive_available, archive_months, compact_scans,
+                     job_lock, read_archive, read_csv_snapshot, remove_month, replace_csv)
+from timesheet import build_timesheet
+
+RAW_MONTHS = 12
+SUMMARY_YEARS = 5
+POLICY_FILE = "retention.json"
+SUMMARY_COLUMNS = ['ID_Employé', 'Nom', 'Prénom', 'Date', 'Arrivée', 'Départ', 'Périodes',
+                   'Heures Travaillées', 'Temps de Pause', 'Pointages', 'Anomalies']
+
+
+def load_policy(data_dir="data"):
+    """Politique de rétention, avec les valeurs par défaut pour les clés absentes"""
+    policy = {'raw_months': RAW_MONTHS, 'summary_years': SUMMARY_YEARS}
+    policy_file = Path(data_dir) / POLICY_FILE
+    if policy_file.exists():
+        with open(policy_file, 'r', encoding='utf-8') as f:
+            policy.update(json.load(f))
+    return policy
+
+
+def months_before(day, count):
+    """Premier jour du mois situé ``count`` mois avant celui de ``day``"""
+    month_index = day.year * 12 + day.month - 1 - count
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _write_gzip_csv(df, path):
+    tmp_path = path.with_name(path.name + '.tmp')
+    df.to_csv(tmp_path, index=False, encoding='utf-8', lineterminator='\n', compression='gzip')
+    os.replace(tmp_path, path)
+
+
+def summarize_month(scans):
+    """Résumé journalier par employé des pointages bruts d'un mois"""
+    frames = []
+    for employee_id, emp_scans in scans.groupby(scans['ID_Employé'].astype(str), sort=True):
+        summary = build_timesheet(emp_scans)
+        counts = emp_scans.groupby(emp_scans['Date'].astype(str)).size()
+        summary['Pointages'] = summary['Date'].map(counts).astype(int)
+        summary['ID_Employé'] = employee_id
+        summary['Nom'] = str(emp_scans['Nom'].iloc[-1])
+        summary['Prénom'] = str(emp_scans['Prénom'].iloc[-1])
+        frames.append(summary)
+    if not frames:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[SUMMARY_COLUMNS]
+
+
+def summary_months(data_dir="data", start=None, end=None):
+    """Mois (AAAA-MM) expirés entre deux dates, dont il ne reste que les résumés"""
+    start = start.strftime('%Y-%m') if start is not None else None
+    end = end.strftime('%Y-%m') if end is not None else None
+    months = sorted(
+        path.name[len("daily_"):-len(".csv.gz")]
+        for path in (Path(data_dir) / "summaries").glob("daily_*.csv.gz")
+    )
+    return [m for m in months if (start is None or m >= start) and (end is None or m <= end)]
+
+
+def read_summaries(data_dir="data", start=None, end=None, employee_id=None):
+    """Résumés journaliers entre deux dates incluses, pour un employé ou tous"""
+    frames = []
+    for month in summary_months(data_dir, start, end):
+        path = Path(data_dir) / "summaries" / f"daily_{month}.csv.gz"
+        summary = pd.read_csv(path, dtype={'ID_Employé': str}, keep_default_na=False)
+        if employee_id is not None:
+            summary = summary[summary['ID_Employé'] == str(employee_id)]
+        frames.append(summary)
+    if not frames:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+
+    summaries = pd.concat(frames, ignore_index=True)
+    start = start.strftime('%Y-%m-%d') if start is not None else None
+    end = end.strftime('%Y-%m-%d') if end is not None else None
+    if start is not None:
+        summaries = summaries[summaries['Date'] >= start]
+    if end is not None:
+        summaries = summaries[summaries['Date'] <= end]
+    return summaries.reset_index(drop=True)
+
+
+def _expire_month(data_dir, month, scans):
+    """Résumé puis archive compressée d'un mois, avant son retrait des données"""
+    scans = scans[SCAN_COLUMNS].astype(str).reset_index(drop=True)
+    expired_path = Path(data_dir) / "archive" / "expired" / f"scans_{month}.csv.gz"
+    if expired_path.exists():
+        existing = pd.read_csv(expired_path, dtype=str, keep_default_na=False)
+        tail = existing.tail(len(scans)).reset_index(drop=True)
+        if len(existing) >= len(scans) and tail.equals(scans):
+            # Reprise après interruption : le mois est déjà dans l'archive
+            scans = existing
+        else:
+            # Pointages arrivés tardivement pour un mois déjà archivé
+            scans = pd.concat([existing, scans], ignore_index=True)
+
+    scans['DateTime'] = pd.to_datetime(scans['Date'] + ' ' + scans['Heure'])
+    _write_gzip_csv(summarize_month(scans), Path(data_dir) / "summaries" / f"daily_{month}.csv.gz")
+    _write_gzip_csv(scans[SCAN_COLUMNS], expired_path)
+
+
+def _purge(data_dir, before_month):
+    """Suppression des résumés et archives compressées antérieurs à ``before_month``"""
+    purged = []
+    patterns = [("summaries", "daily_"), (os.path.join("archive", "expired"), "scans_")]
+    for folder, prefix in patterns:
+        for path in sorted((Path(data_dir) / folder).glob(f"{prefix}*.csv.gz")):
+            month = path.name[len(prefix):-len(".csv.gz")]
+            if month < before_month:
+                path.unlink()
+                purged.append(path.name)
+    return purged
+
+
+def apply_retention(data_dir="data", policy=None, today=None, max_months=None):
+    """Application de la politique de rétention.
+
+    ``max_months`` limite le nombre de mois expirés traités par exécution ;
+    les suivants le seront au prochain lancement. Retourne un résumé du
+    travail effectué ; lève JobRunningError si une compaction ou une
+    rétention est en cours.
+    """
+    with job_lock(data_dir):
+        return _apply_retention(Path(data_dir), policy, today, max_months)
+
+
+def _apply_retention(data_dir, policy, today, max_months):
+    policy = policy or load_policy(data_dir)
+    today = today or date.today()
+    raw_before = months_before(today, policy['raw_months']).strftime('%Y-%m-%d')
+    purge_before = months_before(today, policy['summary_years'] * 12).strftime('%Y-%m')
+
+    (data_dir / "summaries").mkdir(exist_ok=True)
+    (data_dir / "archive" / "expired").mkdir(parents=True, exist_ok=True)
+    scans_file = data_dir / "scans.csv"
+    expired_months = []
+    expired_scans = 0
+
+    if archive_available():
+        # Les pointages expirés encore dans le CSV passent d'abord par l'archive en colonnes
+        compact_scans(data_dir, raw_before)
+        archive_dir = data_dir / "archive"
+        for month in archive_months(archive_dir):
+            if month >= raw_before[:7] or (max_months is not None and len(expired_months) >= max_months):
+                break
+            month_end = pd.Period(month).end_time.strftime('%Y-%m-%d')
+            scans = read_archive(archive_dir, f"{month}-01", month_end)
+            _expire_month(data_dir, month, scans)
+            remove_month(archive_dir, month)
+            expired_months.append(month)
+            expired_scans += len(scans)
+    elif scans_file.exists():
+        scans, size = read_csv_snapshot(scans_file)
+        expired = scans['Date'] < raw_before
+        months = scans.loc[expired, 'Date'].str[:7]
+        done = []
+        for month in sorted(months.unique()):
+            if max_months is not None and len(done) >= max_months:
+                break
+            month_scans = scans[expired & (scans['Date'].str[:7] == month)]
+            _expire_month(data_dir, month, month_scans)
+            done.append(month)
+            expired_scans += len(month_scans)
+        if done:
+            # Retrait des mois traités en une seule réécriture du CSV
+            replace_csv(scans_file, scans[~(expired & scans['Date'].str[:7].isin(done))], size)
+        expired_months = done
+
+    return {
+        'expired_months': expired_months,
+        'expired_scans': expired_scans,
+        'purged_files': _purge(data_dir, purge_before),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rétention des pointages")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--raw-months', type=int, help="Conservation des pointages bruts (mois)")
+    parser.add_argument('--summary-years', type=int, help="Conservation des résumés et archives (années)")
+    parser.add_argument('--max-months', type=int, help="Nombre maximal de mois traités par exécution")
+    args = parser.parse_args()
+
+    policy = load_policy(args.data_dir)
+    if args.raw_months is not None:
+        policy['raw_months'] = args.raw_months
+    if args.summary_years is not None:
+        policy['summary_years'] = args.summary_years
+
+    try:
+        result = apply_retention(args.data_dir, policy, max_months=args.max_months)
+    except JobRunningError as e:
+        parser.exit(1, f"{e}\n")
+    print(f"{result['expired_scans']} pointages archivés "
+          f"({', '.join(result['expired_months']) or 'aucun mois expiré'})")
+    print(f"{len(result['purged_files'])} fichiers purgés")
+
+
+if __name__ == "__main__":
+    main()
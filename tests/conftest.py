@@ -0,0 +1,37 @@
+import random
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Les modules de l'application sont à la racine du dépôt
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from archive import SCAN_COLUMNS  # noqa: E402
+
+
+@pytest.fixture
+def history_dir(tmp_path):
+    """Dossier data/ temporaire avec un historique irrégulier de janvier à juin 2026.
+
+    Retourne le dossier et les pointages écrits dans scans.csv (colonnes texte).
+    """
+    rng = random.Random(7)
+    rows = []
+    for day in pd.date_range('2026-01-05', '2026-06-12', freq='B'):
+        for emp in range(5):
+            if rng.random() < 0.15:
+                continue
+            times = sorted(rng.sample(range(6 * 3600, 20 * 3600), rng.randint(1, 5)))
+            for i, seconds in enumerate(times):
+                # Alternance avec quelques pointages non appariés
+                type_scan = 'Entrée' if (i % 2 == 0) != (rng.random() < 0.1) else 'Sortie'
+                rows.append([f"E{emp}", f"Nom{emp}", f"Prenom{emp}", str(100 + emp),
+                             day.strftime('%Y-%m-%d'), f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}",
+                             type_scan])
+    scans = pd.DataFrame(rows, columns=SCAN_COLUMNS)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    scans.to_csv(data_dir / "scans.csv", index=False, encoding='utf-8', lineterminator='\n')
+    return data_dir, scans
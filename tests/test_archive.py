@@ -0,0 +1,108 @@
+"""Compaction vers l'archive : reprise après interruption, sans perte ni doublon"""
+import pandas as pd
+import pytest
+
+import archive
+from archive import SCAN_COLUMNS, archive_months, compact_scans, read_archive
+
+pytest.importorskip('pyarrow')
+
+
+def stored_rows(data_dir):
+    """Lignes de l'archive et de scans.csv, triées, en texte"""
+    archived = read_archive(data_dir / "archive", columns=SCAN_COLUMNS).astype(str)
+    current = pd.read_csv(data_dir / "scans.csv", dtype=str, keep_default_na=False)
+    return sort_rows(pd.concat([archived, current], ignore_index=True))
+
+
+def sort_rows(scans):
+    return scans[SCAN_COLUMNS].astype(str).sort_values(SCAN_COLUMNS).reset_index(drop=True)
+
+
+def interrupt(monkeypatch, name, after=0):
+    """Fait échouer ``archive.<name>`` après ``after`` appels réussis"""
+    original = getattr(archive, name)
+    calls = []
+
+    def failing(*args, **kwargs):
+        calls.append(args)
+        if len(calls) > after:
+            raise KeyboardInterrupt
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(archive, name, failing)
+
+
+def test_compaction_keeps_every_row(history_dir):
+    data_dir, scans = history_dir
+    count = compact_scans(data_dir, '2026-06-01')
+    assert count == (scans['Date'] < '2026-06-01').sum()
+    assert archive_months(data_dir / "archive") == ['2026-01', '2026-02', '2026-03', '2026-04', '2026-05']
+    assert stored_rows(data_dir).equals(sort_rows(scans))
+    current = pd.read_csv(data_dir / "scans.csv", dtype=str)
+    assert (current['Date'] >= '2026-06-01').all()
+
+
+@pytest.mark.parametrize('name, after', [
+    ('_write_month', 2),    # au milieu des mois, archive partiellement écrite
+    ('replace_csv', 0),     # archive écrite, CSV pas encore réécrit
+])
+def test_interrupted_compaction_is_rolled_back_then_resumed(history_dir, monkeypatch, name, after):
+    data_dir, scans = history_dir
+    # Un premier mois déjà archivé, auquel la compaction interrompue ajoute des lignes
+    compact_scans(data_dir, '2026-02-01')
+    interrupt(monkeypatch, name, after)
+    with pytest.raises(KeyboardInterrupt):
+        compact_scans(data_dir, '2026-06-01')
+    assert (data_dir / "archive" / archive.JOURNAL_FILE).exists()
+    monkeypatch.undo()
+
+    compact_scans(data_dir, '2026-06-01')
+    assert not (data_dir / "archive" / archive.JOURNAL_FILE).exists()
+    assert stored_rows(data_dir).equals(sort_rows(scans))
+
+
+def test_interrupted_after_csv_rewrite_keeps_archive(history_dir, monkeypatch):
+    data_dir, scans = history_dir
+    # Arrêt juste avant la suppression du journal : le CSV est déjà réécrit
+    original = archive.replace_csv
+
+    def replace_then_stop(*args, **kwargs):
+        original(*args, **kwargs)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(archive, 'replace_csv', replace_then_stop)
+    with pytest.raises(KeyboardInterrupt):
+        compact_scans(data_dir, '2026-06-01')
+    monkeypatch.undo()
+
+    assert compact_scans(data_dir, '2026-06-01') == 0
+    assert stored_rows(data_dir).equals(sort_rows(scans))
+
+
+def test_rows_appended_during_compaction_are_kept(history_dir, monkeypatch):
+    data_dir, scans = history_dir
+    late = pd.DataFrame([['E9', 'Nom9', 'Prenom9', '109', '2026-06-12', '18:00:00', 'Entrée']],
+                        columns=SCAN_COLUMNS)
+    original = archive.read_csv_snapshot
+
+    def snapshot_then_append(scans_file):
+        result = original(scans_file)
+        # Pointage ajouté entre la lecture et la réécriture du CSV
+        late.to_csv(scans_file, mode='a', header=False, index=False, lineterminator='\n')
+        return result
+
+    monkeypatch.setattr(archive, 'read_csv_snapshot', snapshot_then_append)
+    compact_scans(data_dir, '2026-06-01')
+    assert stored_rows(data_dir).equals(sort_rows(pd.concat([scans, late], ignore_index=True)))
+
+
+def test_month_index_matches_archive(history_dir):
+    data_dir, _ = history_dir
+    compact_scans(data_dir, '2026-06-01')
+    index = archive.month_index(data_dir / "archive", '2026-03')
+    month = read_archive(data_dir / "archive", '2026-03-01', '2026-03-31')
+    positions, times = index.employee('E2')
+    expected = month[month['ID_Employé'] == 'E2'].sort_values('DateTime', kind='stable')
+    assert index.rows(positions)['DateTime'].tolist() == expected['DateTime'].tolist()
+    assert index.employee('E9') is None
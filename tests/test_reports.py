@@ -0,0 +1,148 @@
+"""Métriques du rapport personnalisé : calcul en série, en parallèle et boucle d'origine"""
+import random
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from archive import REPORT_COLUMNS
+from reports import compute_employee_metrics
+
+START = date(2026, 3, 2)
+END = date(2026, 3, 15)
+
+
+def make_scans(rows):
+    scans = pd.DataFrame(rows, columns=['ID_Employé', 'Date', 'Heure', 'Type_Scan'])
+    scans['DateTime'] = pd.to_datetime(scans['Date'] + ' ' + scans['Heure'])
+    return scans.sort_values('DateTime', kind='stable').reset_index(drop=True)[REPORT_COLUMNS]
+
+
+def irregular_history():
+    """Pointages irréguliers : paires incomplètes, retards, employés sans pointage"""
+    rng = random.Random(42)
+    rows = []
+    day = lambda offset: (START + timedelta(days=offset)).strftime('%Y-%m-%d')
+
+    # Journées régulières avec pause déjeuner
+    for offset in range(10):
+        rows += [('E0', day(offset), '08:30:00', 'Entrée'), ('E0', day(offset), '12:00:00', 'Sortie'),
+                 ('E0', day(offset), '13:00:00', 'Entrée'), ('E0', day(offset), '17:30:00', 'Sortie')]
+
+    # Entrées et sorties non appariées
+    rows += [('E1', day(0), '08:00:00', 'Entrée'), ('E1', day(0), '08:05:00', 'Entrée'),
+             ('E1', day(0), '12:00:00', 'Sortie')]
+    rows += [('E1', day(1), '07:55:00', 'Sortie'), ('E1', day(1), '08:10:00', 'Entrée'),
+             ('E1', day(1), '16:00:00', 'Sortie'), ('E1', day(1), '16:30:00', 'Entrée')]
+    rows += [('E1', day(2), '09:00:00', 'Sortie'), ('E1', day(2), '10:00:00', 'Sortie')]
+    rows += [('E1', day(3), '12:00:00', 'Sortie'), ('E1', day(3), '13:00:00', 'Entrée'),
+             ('E1', day(3), '13:30:00', 'Entrée'), ('E1', day(3), '18:00:00', 'Sortie')]
+
+    # Retards : 9h15 compte, 9h00 et 10h00 pile non (règle d'origine)
+    for offset, heure in enumerate(['09:15:00', '09:00:00', '10:00:00', '10:45:00', '08:59:00']):
+        rows += [('E2', day(offset), heure, 'Entrée'), ('E2', day(offset), '17:00:00', 'Sortie')]
+
+    # Séquences aléatoires
+    for emp in range(4, 12):
+        for offset in range(14):
+            if rng.random() < 0.2:
+                continue
+            for _ in range(rng.randint(1, 6)):
+                heure = f"{rng.randint(6, 19):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+                rows.append((f"E{emp}", day(offset), heure, rng.choice(['Entrée', 'Sortie'])))
+
+    return make_scans(rows)
+
+
+def legacy_metrics(scans, employee_id, start_date, end_date):
+    """Boucle jour par jour du rapport personnalisé d'origine"""
+    def daily_hours(date_str):
+        day_scans = scans[(scans['ID_Employé'] == employee_id) & (scans['Date'] == date_str)].sort_values('DateTime')
+        total = timedelta()
+        entry_time = None
+        for _, scan in day_scans.iterrows():
+            if scan['Type_Scan'] == 'Entrée':
+                entry_time = pd.to_datetime(scan['Date'] + ' ' + scan['Heure'])
+            elif scan['Type_Scan'] == 'Sortie' and entry_time is not None:
+                total += pd.to_datetime(scan['Date'] + ' ' + scan['Heure']) - entry_time
+                entry_time = None
+        return total.total_seconds() / 3600
+
+    total_hours = 0
+    total_breaks = 0
+    worked_days = 0
+    late_days = 0
+    current_date = start_date
+    while current_date <= end_date:
+        date_str = current_date.strftime('%Y-%m-%d')
+        hours = daily_hours(date_str)
+        if hours > 0:
+            total_hours += hours
+            worked_days += 1
+
+            day_scans = scans[(scans['ID_Employé'] == employee_id) & (scans['Date'] == date_str) &
+                              (scans['Type_Scan'] == 'Entrée')]
+            if not day_scans.empty:
+                first_entry = pd.to_datetime(day_scans.iloc[0]['Heure'])
+                if first_entry.hour >= 9 and first_entry.minute > 0:
+                    late_days += 1
+
+            day_scans = scans[(scans['ID_Employé'] == employee_id) &
+                              (scans['Date'] == date_str)].sort_values('DateTime')
+            entry_time = None
+            for _, scan in day_scans.iterrows():
+                if scan['Type_Scan'] == 'Sortie':
+                    entry_time = pd.to_datetime(scan['Date'] + ' ' + scan['Heure'])
+                elif scan['Type_Scan'] == 'Entrée' and entry_time is not None:
+                    exit_time = pd.to_datetime(scan['Date'] + ' ' + scan['Heure'])
+                    total_breaks += (exit_time - entry_time).total_seconds() / 3600
+        current_date += timedelta(days=1)
+
+    return {'total_hours': total_hours, 'total_breaks': total_breaks,
+            'worked_days': worked_days, 'late_days': late_days}
+
+
+@pytest.fixture(scope='module')
+def history():
+    scans = irregular_history()
+    # E3 et E12 n'ont aucun pointage
+    employee_ids = [f"E{i}" for i in range(13)]
+    groups = dict(tuple(scans.groupby('ID_Employé', sort=False)))
+    per_employee = [groups.get(emp, scans.iloc[0:0]) for emp in employee_ids]
+    return scans, employee_ids, per_employee
+
+
+def test_parallel_matches_serial(history):
+    _, _, per_employee = history
+    serial = compute_employee_metrics(per_employee, workers=1)
+    parallel = compute_employee_metrics(per_employee, workers=2)
+    assert parallel == serial
+
+
+def test_matches_legacy_daily_loop(history):
+    scans, employee_ids, per_employee = history
+    expected = [legacy_metrics(scans, emp, START, END) for emp in employee_ids]
+    for workers in (1, 2):
+        results = compute_employee_metrics(per_employee, workers=workers)
+        for emp, result, legacy in zip(employee_ids, results, expected):
+            assert result['worked_days'] == legacy['worked_days'], emp
+            assert result['late_days'] == legacy['late_days'], emp
+            assert result['total_hours'] == pytest.approx(legacy['total_hours']), emp
+            assert result['total_breaks'] == pytest.approx(legacy['total_breaks']), emp
+
+
+def test_irregular_cases(history):
+    _, employee_ids, per_employee = history
+    results = dict(zip(employee_ids, compute_employee_metrics(per_employee, workers=1)))
+    assert results['E3'] == {'total_hours': 0, 'total_breaks': 0, 'worked_days': 0, 'late_days': 0}
+    # Seuls 9h15 et 10h45 sont des retards
+    assert results['E2']['late_days'] == 2
+    # Journée faite uniquement de sorties : non travaillée
+    assert results['E1']['worked_days'] == 3
+
+
+def test_progress_reports_every_employee(history):
+    _, _, per_employee = history
+    calls = []
+    compute_employee_metrics(per_employee, workers=1, progress=lambda done, total: calls.append((done, total)))
+    assert calls == [(i, len(per_employee)) for i in range(1, len(per_employee) + 1)]
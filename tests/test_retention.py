@@ -0,0 +1,108 @@
+"""Rétention : reprise après interruption, résumés et purge"""
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import retention
+from archive import SCAN_COLUMNS, archive_months
+from retention import apply_retention, read_summaries
+from timesheet import build_timesheet
+
+TODAY = date(2026, 6, 15)
+POLICY = {'raw_months': 2, 'summary_years': 5}
+EXPIRED = ['2026-01', '2026-02', '2026-03']
+
+
+def sort_rows(scans):
+    return scans[SCAN_COLUMNS].astype(str).sort_values(SCAN_COLUMNS).reset_index(drop=True)
+
+
+def expired_rows(data_dir, month):
+    path = Path(data_dir) / "archive" / "expired" / f"scans_{month}.csv.gz"
+    return sort_rows(pd.read_csv(path, dtype=str, keep_default_na=False))
+
+
+def live_months(data_dir):
+    """Mois encore présents dans l'application (archive et CSV)"""
+    current = pd.read_csv(Path(data_dir) / "scans.csv", dtype=str)['Date'].str[:7]
+    return sorted(set(archive_months(Path(data_dir) / "archive")) | set(current))
+
+
+def assert_expired_exactly_once(data_dir, scans):
+    for month in EXPIRED:
+        expected = sort_rows(scans[scans['Date'].str[:7] == month])
+        assert expired_rows(data_dir, month).equals(expected), month
+    assert live_months(data_dir) == ['2026-04', '2026-05', '2026-06']
+
+
+def fail_on_call(monkeypatch, name):
+    def failing(*args, **kwargs):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(retention, name, failing)
+
+
+def test_interrupted_before_remove_month(history_dir, monkeypatch):
+    pytest.importorskip('pyarrow')
+    data_dir, scans = history_dir
+    # Résumé et archive compressée écrits, mois pas encore retiré de l'archive
+    fail_on_call(monkeypatch, 'remove_month')
+    with pytest.raises(KeyboardInterrupt):
+        apply_retention(data_dir, POLICY, TODAY)
+    monkeypatch.undo()
+
+    result = apply_retention(data_dir, POLICY, TODAY)
+    assert result['expired_months'] == EXPIRED
+    assert_expired_exactly_once(data_dir, scans)
+    assert apply_retention(data_dir, POLICY, TODAY)['expired_months'] == []
+
+
+def test_interrupted_before_replace_csv(history_dir, monkeypatch):
+    data_dir, scans = history_dir
+    # Sans pyarrow : les mois expirés sont retirés du CSV en une réécriture
+    monkeypatch.setattr(retention, 'archive_available', lambda: False)
+    fail_on_call(monkeypatch, 'replace_csv')
+    with pytest.raises(KeyboardInterrupt):
+        apply_retention(data_dir, POLICY, TODAY)
+    monkeypatch.undo()
+    monkeypatch.setattr(retention, 'archive_available', lambda: False)
+
+    apply_retention(data_dir, POLICY, TODAY)
+    assert_expired_exactly_once(data_dir, scans)
+
+
+def test_max_months_resumes_month_by_month(history_dir):
+    data_dir, scans = history_dir
+    assert apply_retention(data_dir, POLICY, TODAY, max_months=1)['expired_months'] == ['2026-01']
+    assert apply_retention(data_dir, POLICY, TODAY, max_months=1)['expired_months'] == ['2026-02']
+    apply_retention(data_dir, POLICY, TODAY)
+    assert_expired_exactly_once(data_dir, scans)
+
+
+def test_summaries_match_timesheet(history_dir):
+    data_dir, scans = history_dir
+    apply_retention(data_dir, POLICY, TODAY)
+
+    month = scans[scans['Date'].str[:7] == '2026-02'].copy()
+    month['DateTime'] = pd.to_datetime(month['Date'] + ' ' + month['Heure'])
+    summaries = read_summaries(data_dir, date(2026, 2, 1), date(2026, 2, 28))
+    assert sorted(summaries['ID_Employé'].unique()) == sorted(month['ID_Employé'].unique())
+    for employee_id, emp_scans in month.groupby('ID_Employé'):
+        expected = build_timesheet(emp_scans)
+        expected['Pointages'] = expected['Date'].map(emp_scans.groupby('Date').size())
+        summary = summaries[summaries['ID_Employé'] == employee_id][expected.columns]
+        pd.testing.assert_frame_equal(summary.reset_index(drop=True), expected, check_dtype=False)
+
+
+def test_purge_honours_summary_years(history_dir):
+    data_dir, _ = history_dir
+    apply_retention(data_dir, POLICY, TODAY)
+    # Neuf mois plus tard, un an de résumés : janvier et février 2026 sont purgés
+    result = apply_retention(data_dir, {'raw_months': 2, 'summary_years': 1}, date(2027, 3, 15))
+    assert sorted(result['purged_files']) == sorted([
+        'daily_2026-01.csv.gz', 'daily_2026-02.csv.gz', 'scans_2026-01.csv.gz', 'scans_2026-02.csv.gz'
+    ])
+    kept = sorted(p.name for p in (data_dir / "summaries").glob("*.csv.gz"))
+    assert kept == [f"daily_2026-0{m}.csv.gz" for m in range(3, 7)]
+    assert read_summaries(data_dir, date(2026, 1, 1), date(2026, 2, 28)).empty
@@ -0,0 +1,160 @@
+"""Feuille de temps par employé.
+
+``ScanIndex`` retrouve les pointages d'un employé mois par mois. Pour un mois
+archivé, il lit l'index par employé enregistré à côté du mois
+(``archive.MonthIndex``) puis les seules lignes de l'employé ; la période en
+cours, encore dans scans.csv, est indexée en mémoire. Ouvrir la feuille d'un
+employé ne lit donc pas les pointages des autres employés des mois archivés.
+"""
+import numpy as np
+import pandas as pd
+
+from archive import REPORT_COLUMNS
+
+LATE_HOUR = 9
+# Au-delà, les blocs ajoutés à un mois sont regroupés en un seul
+MAX_BLOCKS_PER_MONTH = 32
+
+
+class FrameIndex:
+    """Index par employé de pointages en mémoire, même interface que ``archive.MonthIndex``"""
+
+    def __init__(self, scans):
+        self.scans = scans.sort_values('DateTime', kind='stable').reset_index(drop=True)
+        times = self.scans['DateTime'].to_numpy(dtype='datetime64[ns]')
+        ids = self.scans['ID_Employé'].astype(str).to_numpy()
+        order = np.argsort(ids, kind='stable')
+        ids_sorted = ids[order]
+        bounds = np.flatnonzero(ids_sorted[1:] != ids_sorted[:-1]) + 1
+        self.groups = {}
+        for group in np.split(order, bounds) if len(order) else []:
+            self.groups[ids[group[0]]] = (group, times[group])
+
+    def employee(self, employee_id):
+        """Positions et horodatages des pointages d'un employé, ou None"""
+        return self.groups.get(str(employee_id))
+
+    def rows(self, positions, columns=REPORT_COLUMNS):
+        """Lignes aux positions données"""
+        return self.scans.iloc[positions][columns]
+
+
+class ScanIndex:
+    """Index des pointages par employé, construit mois par mois à la demande.
+
+    ``load_month(mois)`` retourne les index (``FrameIndex`` ou
+    ``archive.MonthIndex``) des pointages d'un mois (AAAA-MM).
+    """
+
+    def __init__(self, load_month):
+        self._load_month = load_month
+        self._blocks = {}
+
+    def _month_blocks(self, month):
+        if month not in self._blocks:
+            self._blocks[month] = list(self._load_month(month))
+        return self._blocks[month]
+
+    def append(self, new_scans):
+        """Ajout de nouveaux pointages aux mois déjà indexés"""
+        if new_scans.empty:
+            return
+        months = new_scans['DateTime'].dt.strftime('%Y-%m')
+        for month, rows in new_scans.groupby(months):
+            blocks = self._blocks.get(month)
+            if blocks is None:
+                # Mois pas encore lu : ses pointages seront chargés avec lui
+                continue
+            blocks.append(FrameIndex(rows[REPORT_COLUMNS]))
+            frames = [b for b in blocks if isinstance(b, FrameIndex)]
+            if len(frames) > MAX_BLOCKS_PER_MONTH:
+                merged = FrameIndex(pd.concat([b.scans for b in frames], ignore_index=True))
+                self._blocks[month] = [b for b in blocks if not isinstance(b, FrameIndex)] + [merged]
+
+    def _slices(self, employee_id, start, end):
+        """Pointages de l'employé par bloc : (bloc, positions, horodatages)"""
+        start = np.datetime64(pd.Timestamp(start))
+        end = np.datetime64(pd.Timestamp(end) + pd.Timedelta(days=1))
+        for period in pd.period_range(pd.Timestamp(start), pd.Timestamp(end - 1), freq='M'):
+            for block in self._month_blocks(period.strftime('%Y-%m')):
+                found = block.employee(employee_id)
+                if found is None:
+                    continue
+                positions, times = found
+                lo = np.searchsorted(times, start, 'left')
+                hi = np.searchsorted(times, end, 'left')
+                if hi > lo:
+                    yield block, positions[lo:hi], times[lo:hi]
+
+    def employee_scans(self, employee_id, start, end):
+        """Pointages d'un employé entre deux dates incluses, dans l'ordre chronologique"""
+        pieces = [block.rows(positions) for block, positions, _ in self._slices(employee_id, start, end)]
+        if not pieces:
+            return pd.DataFrame(columns=REPORT_COLUMNS)
+        if len(pieces) == 1:
+            return pieces[0]
+        return pd.concat(pieces, ignore_index=True).sort_values('DateTime', kind='stable')
+
+    def employee_days(self, employee_id, start, end):
+        """Jours (datetime64[D]) où l'employé a pointé entre deux dates incluses.
+
+        Ne lit que les index des mois, pas les pointages.
+        """
+        days = [times.astype('datetime64[D]') for _, _, times in self._slices(employee_id, start, end)]
+        if not days:
+            return np.array([], dtype='datetime64[D]')
+        return np.unique(np.concatenate(days))
+
+
+def build_timesheet(scans):
+    """Feuille de temps journalière à partir des pointages d'un employé.
+
+    Les entrées et sorties sont appariées dans l'ordre, comme dans
+    ``PointageSystem.calculate_daily_hours`` ; les pointages qui ne forment
+    pas de paire sont signalés comme anomalies.
+    """
+    rows = []
+    for date_str, day_scans in scans.groupby(scans['Date'].astype(str), sort=True):
+        day_scans = day_scans.sort_values('DateTime', kind='stable')
+        periods = []
+        anomalies = []
+        worked = pd.Timedelta(0)
+        pause = pd.Timedelta(0)
+        entry_time = None
+        last_exit = None
+
+        for scan in day_scans.itertuples(index=False):
+            if scan.Type_Scan == 'Entrée':
+                if entry_time is not None:
+                    anomalies.append(f"Entrée sans sortie à {entry_time.strftime('%H:%M')}")
+                if last_exit is not None:
+                    pause += scan.DateTime - last_exit
+                    last_exit = None
+                entry_time = scan.DateTime
+            elif entry_time is not None:
+                periods.append(f"{entry_time.strftime('%H:%M')}-{scan.DateTime.strftime('%H:%M')}")
+                worked += scan.DateTime - entry_time
+                entry_time = None
+                last_exit = scan.DateTime
+            else:
+                anomalies.append(f"Sortie sans entrée à {scan.DateTime.strftime('%H:%M')}")
+
+        if entry_time is not None:
+            anomalies.append(f"Entrée sans sortie à {entry_time.strftime('%H:%M')}")
+        first_entry = day_scans[day_scans['Type_Scan'] == 'Entrée']['DateTime']
+        if not first_entry.empty and first_entry.iloc[0].hour >= LATE_HOUR and first_entry.iloc[0].minute > 0:
+            anomalies.append("Retard")
+
+        rows.append({
+            'Date': date_str,
+            'Arrivée': day_scans['Heure'].iloc[0],
+            'Départ': day_scans['Heure'].iloc[-1],
+            'Périodes': ', '.join(periods),
+            'Heures Travaillées': round(worked.total_seconds() / 3600, 2),
+            'Temps de Pause': round(pause.total_seconds() / 3600, 2),
+            'Anomalies': ', '.join(anomalies),
+        })
+
+    return pd.DataFrame(rows, columns=[
+        'Date', 'Arrivée', 'Départ', 'Périodes', 'Heures Travaillées', 'Temps de Pause', 'Anomalies'
+    ])